@@ -54,10 +54,10 @@ def process_labels(
             _all_labels_raw = np.array(list(labels.values()))
             _unique_raw = np.unique(_all_labels_raw)
             max_label = np.max(_unique_raw)
-            labels = {
-                k: to_onehot(v, max_label+1)  # type: ignore
-                for k, v in labels.items()
-            }
+            labels = dict(zip(
+                labels.keys(),
+                to_onehot(_all_labels_raw, max_label+1)  # type: ignore
+            ))
             num_outcomes = 1
         else:
             first_label = list(labels.values())[0]
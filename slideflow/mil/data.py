@@ -1,28 +1,47 @@
 """Dataset utility functions for MIL."""
 
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import partial
 from typing import Any, List, Optional, Tuple, Callable, Union, Protocol
 from pathlib import Path
 
 import numpy as np
 import numpy.typing as npt
 import torch
+from packaging import version
 from torch.utils.data import Dataset
 
 # -----------------------------------------------------------------------------
 
+def _zip(use_lens, bag, targets):
+    features, lengths = bag
+    if use_lens:
+        return (features, lengths, targets)
+    else:
+        return (features, targets)
+
+
+def _zip_clam(bag, targets):
+    features, lengths = bag
+    return (features, targets, True), targets
+
+
+def _zip_multibag(use_lens, bags_and_lengths, targets):
+    if use_lens:
+        return *bags_and_lengths, targets
+    else:
+        return [b[0] for b in bags_and_lengths], targets
+
+
 def build_dataset(bags, targets, encoder, bag_size, use_lens=False):
     assert len(bags) == len(targets)
 
-    def _zip(bag, targets):
-        features, lengths = bag
-        if use_lens:
-            return (features, lengths, targets.squeeze())
-        else:
-            return (features, targets.squeeze())
-
     dataset = MapDataset(
-        _zip,
+        partial(_zip, use_lens),
         BagDataset(bags, bag_size=bag_size),
         EncodedDataset(encoder, targets),
     )
@@ -32,12 +51,8 @@ def build_dataset(bags, targets, encoder, bag_size, use_lens=False):
 def build_clam_dataset(bags, targets, encoder, bag_size):
     assert len(bags) == len(targets)
 
-    def _zip(bag, targets):
-        features, lengths = bag
-        return (features, targets.squeeze(), True), targets.squeeze()
-
     dataset = MapDataset(
-        _zip,
+        _zip_clam,
         BagDataset(bags, bag_size=bag_size),
         EncodedDataset(encoder, targets),
     )
@@ -47,14 +62,8 @@ def build_clam_dataset(bags, targets, encoder, bag_size):
 def build_multibag_dataset(bags, targets, encoder, bag_size, n_bags, use_lens=False):
     assert len(bags) == len(targets)
 
-    def _zip(bags_and_lengths, targets):
-        if use_lens:
-            return *bags_and_lengths, targets.squeeze()
-        else:
-            return [b[0] for b in bags_and_lengths], targets.squeeze()
-
     dataset = MapDataset(
-        _zip,
+        partial(_zip_multibag, use_lens),
         MultiBagDataset(bags, n_bags, bag_size=bag_size),
         EncodedDataset(encoder, targets),
     )
@@ -63,27 +72,128 @@ def build_multibag_dataset(bags, targets, encoder, bag_size, n_bags, use_lens=Fa
 
 # -----------------------------------------------------------------------------
 
+# Process-wide LRU cache of loaded bags, keyed by (path, mtime, dtype).
+# The byte budget is set with the SF_BAG_CACHE_BYTES environment variable
+# and defaults to 0 (caching disabled).
+_BAG_CACHE = OrderedDict()  # type: OrderedDict
+_BAG_CACHE_LOCK = threading.Lock()
+_BAG_CACHE_BYTES = int(os.environ.get('SF_BAG_CACHE_BYTES', 0))
+_bag_cache_size = 0
+
+# Thread pool for concurrently loading multiple bags per sample.
+_LOAD_POOL = None  # type: Optional[ThreadPoolExecutor]
+_LOAD_POOL_PID = None  # type: Optional[int]
+
+
+def _cache_nbytes(tensor: torch.Tensor) -> int:
+    return tensor.numel() * tensor.element_size()
+
+
+def _load_bag(path: str, dtype: torch.dtype = torch.float32) -> torch.Tensor:
+    """Load a bag of features from a `.pt` file as a tensor of type `dtype`.
+
+    On PyTorch >= 2.1, the file is memory-mapped so that repeated loads across
+    epochs and DataLoader workers are served from the OS page cache. The
+    dtype conversion is skipped if the stored tensor already has this dtype.
+
+    If the SF_BAG_CACHE_BYTES environment variable is set, loaded bags are
+    kept in a process-wide LRU cache up to the given number of bytes.
+    """
+    global _bag_cache_size
+
+    if not _BAG_CACHE_BYTES:
+        return _read_bag(path, dtype)
+
+    key = (path, os.path.getmtime(path), dtype)
+    with _BAG_CACHE_LOCK:
+        if key in _BAG_CACHE:
+            _BAG_CACHE.move_to_end(key)
+            return _BAG_CACHE[key]
+
+    feats = _read_bag(path, dtype)
+    nbytes = _cache_nbytes(feats)
+    if nbytes > _BAG_CACHE_BYTES:
+        return feats
+
+    with _BAG_CACHE_LOCK:
+        if key not in _BAG_CACHE:
+            _BAG_CACHE[key] = feats
+            _bag_cache_size += nbytes
+        # Evict least-recently-used bags until under budget.
+        while _bag_cache_size > _BAG_CACHE_BYTES:
+            _, evicted = _BAG_CACHE.popitem(last=False)
+            _bag_cache_size -= _cache_nbytes(evicted)
+    return feats
+
+
+def _read_bag(path: str, dtype: torch.dtype) -> torch.Tensor:
+    """Read a bag of features from disk, without caching."""
+    if version.parse(torch.__version__) >= version.parse("2.1"):
+        feats = torch.load(path, mmap=True, weights_only=True)
+    else:
+        feats = torch.load(path)
+    if feats.dtype != dtype:
+        feats = feats.to(dtype)
+    return feats
+
+
+def _numpy_to_tensor(bag: np.ndarray, dtype: torch.dtype) -> torch.Tensor:
+    return torch.from_numpy(bag).to(dtype)
+
+
+def _tensor_to_dtype(bag: torch.Tensor, dtype: torch.dtype) -> torch.Tensor:
+    return bag.to(dtype)
+
+
+def _load_and_concat_bags(paths: List[str], dtype: torch.dtype) -> torch.Tensor:
+    return torch.cat([_load_bag(path, dtype) for path in paths])
+
+
+def _get_load_pool() -> ThreadPoolExecutor:
+    """Get the thread pool used for concurrent bag loading.
+
+    The pool is created lazily in each process, as thread pools do not
+    survive forking into DataLoader workers. The number of threads is set
+    with the SF_BAG_LOAD_THREADS environment variable (default: 4).
+    """
+    global _LOAD_POOL, _LOAD_POOL_PID
+    if _LOAD_POOL is None or _LOAD_POOL_PID != os.getpid():
+        _LOAD_POOL = ThreadPoolExecutor(
+            max_workers=int(os.environ.get('SF_BAG_LOAD_THREADS', 4))
+        )
+        _LOAD_POOL_PID = os.getpid()
+    return _LOAD_POOL
+
+
+def _sample_indices(n: int, k: int) -> torch.Tensor:
+    """Sample up to `k` unique indices from `range(n)`, in random order.
+
+    When only a small subset of a large bag is needed, sampling is performed
+    with numpy's Generator.choice (Floyd's algorithm), which avoids generating
+    and sorting a full permutation of all `n` indices. The generator is seeded
+    from torch's RNG so that `torch.manual_seed` and per-worker seeding in
+    the DataLoader continue to govern sampling.
+    """
+    if n <= k:
+        return torch.randperm(n)
+    seed = int(torch.randint(0, 2**62, (1,)))
+    idx = np.random.default_rng(seed).choice(n, k, replace=False)
+    return torch.from_numpy(idx)
+
+
 def _to_fixed_size_bag(
     bag: torch.Tensor,
     bag_size: int = 512
 ) -> Tuple[torch.Tensor, int]:
-    # If the bag has more than two dimensions, reduce it to [N, 2048]
-    if bag.dim() > 2:
-        bag_flattened = bag.mean(dim=[2, 3])  # Average over the last two dimensions
-    else:
-        bag_flattened = bag  # Use the bag as is if it is already 2D
     # get up to bag_size elements
-    bag_idxs = torch.randperm(bag.shape[0])[:bag_size]
-    bag_samples = bag[bag_idxs]
-
-    # zero-pad if we don't have enough samples
-    zero_padded = torch.cat(
-        (
-            bag_samples,
-            torch.zeros(bag_size - bag_samples.shape[0], bag_samples.shape[1]),
-        )
-    )
-    return zero_padded, min(bag_size, len(bag))
+    bag_idxs = _sample_indices(bag.shape[0], bag_size)
+    n_samples = bag_idxs.shape[0]
+
+    # zero-pad if we don't have enough samples, writing the sampled
+    # instances directly into a preallocated output tensor.
+    zero_padded = bag.new_zeros(bag_size, bag.shape[1])
+    zero_padded[:n_samples].copy_(bag[bag_idxs])
+    return zero_padded, n_samples
 
 # -----------------------------------------------------------------------------
 
@@ -94,7 +204,8 @@ class BagDataset(Dataset):
         self,
         bags: Union[List[Path], List[np.ndarray], List[torch.Tensor], List[List[str]]],
         bag_size: Optional[int] = None,
-        preload: bool = False
+        preload: bool = False,
+        dtype: torch.dtype = torch.float32
     ):
         """A dataset of bags of instances.
 
@@ -112,45 +223,79 @@ class BagDataset(Dataset):
                 containing more instances, a random sample of `bag_size`
                 instances will be drawn.  Smaller bags are padded with zeros.
                 If `bag_size` is None, all the samples will be used.
+            preload (bool):  Load all bags into memory at initialization.
+                If all bags share the same feature dimension, features are
+                stored in a single contiguous tensor. Defaults to False.
+            dtype (torch.dtype):  Data type in which features are stored
+                once loaded. Using torch.bfloat16 or torch.float16 halves
+                the memory footprint of preloaded bags. Features are
+                upcast to float32 when retrieved. Defaults to torch.float32.
 
         """
         super().__init__()
         self.bags = bags
         self.bag_size = bag_size
         self.preload = preload
+        self.dtype = dtype
+        self._buffer = None  # type: Optional[torch.Tensor]
+        self._offsets = None  # type: Optional[List[int]]
+
+        # Resolve the loading method for each bag once, rather than
+        # checking the bag type on every access.
+        self._loaders = [self._make_loader(b) for b in self.bags]
 
         if self.preload:
-            self.bags = [self._load(i) for i in range(len(self.bags))]
+            loaded = [self._load(i) for i in range(len(self.bags))]
+            if (len(loaded)
+               and all(b.dim() == 2 for b in loaded)
+               and len(set(b.shape[1] for b in loaded)) == 1):
+                # Store all bags in one contiguous (sum(N), F) tensor,
+                # with per-bag offsets into the buffer. The buffer is not
+                # moved to shared memory here: forked DataLoader workers
+                # share its pages copy-on-write, and torch moves it to
+                # shared memory itself if the dataset is sent to spawned
+                # workers.
+                self._buffer = torch.cat(loaded)
+                self._offsets = np.concatenate(
+                    ([0], np.cumsum([len(b) for b in loaded]))
+                ).tolist()
+            else:
+                self.bags = loaded
+            self._loaders = None
 
     def __len__(self):
         return len(self.bags)
 
-    def _load(self, index: int):
-        if isinstance(self.bags[index], str):
-            feats = torch.load(self.bags[index]).to(torch.float32)
-        elif isinstance(self.bags[index], np.ndarray):
-            feats = torch.from_numpy(self.bags[index]).to(torch.float32)
-        elif isinstance(self.bags[index], torch.Tensor):
-            feats = self.bags[index]
+    def _make_loader(self, bag: Any) -> Callable[[], torch.Tensor]:
+        """Build a callable that loads the given bag as a tensor."""
+        if isinstance(bag, str):
+            return partial(_load_bag, bag, self.dtype)
+        elif isinstance(bag, np.ndarray):
+            return partial(_numpy_to_tensor, bag, self.dtype)
+        elif isinstance(bag, torch.Tensor):
+            return partial(_tensor_to_dtype, bag, self.dtype)
         else:
-            feats = torch.cat([
-                torch.load(slide).to(torch.float32)
-                for slide in self.bags[index]
-            ])
-        return feats
+            return partial(_load_and_concat_bags, bag, self.dtype)
+
+    def _load(self, index: int):
+        return self._loaders[index]()
 
     def __getitem__(self, index: int) -> Tuple[torch.Tensor, int]:
         # collect all the features
-        if self.preload:
+        if self._buffer is not None:
+            start, end = self._offsets[index], self._offsets[index + 1]
+            feats = self._buffer[start:end]
+        elif self.preload:
             feats = self.bags[index]
         else:
             feats = self._load(index)
 
         # sample a subset, if required
         if self.bag_size:
-            return _to_fixed_size_bag(feats, bag_size=self.bag_size)
+            feats, n = _to_fixed_size_bag(feats, bag_size=self.bag_size)
         else:
-            return feats, len(feats)
+            n = len(feats)
+        return feats.to(torch.float32), n
 
 # -----------------------------------------------------------------------------
 
@@ -183,22 +328,27 @@ class MultiBagDataset(Dataset):
     def __len__(self):
         return len(self.bags)
 
+    @staticmethod
+    def _load_one(bag: Union[str, np.ndarray, torch.Tensor]) -> torch.Tensor:
+        if isinstance(bag, str):
+            return _load_bag(bag)
+        elif isinstance(bag, np.ndarray):
+            return torch.from_numpy(bag)
+        elif isinstance(bag, torch.Tensor):
+            return bag
+        else:
+            raise ValueError("Invalid bag type: {}".format(type(bag)))
+
     def __getitem__(self, index: int) -> Tuple[torch.Tensor, int]:
 
         bags = self.bags[index]
         assert len(bags) == self.n_bags
 
-        # Load to tensors.
-        loaded_bags = []
-        for bag in bags:
-            if isinstance(bag, str):
-                loaded_bags.append(torch.load(bag).to(torch.float32))
-            elif isinstance(self.bags[index], np.ndarray):
-                loaded_bags.append(torch.from_numpy(bag))
-            elif isinstance(self.bags[index], torch.Tensor):
-                loaded_bags.append(bag)
-            else:
-                raise ValueError("Invalid bag type: {}".format(type(bag)))
+        # Load to tensors, reading bag files concurrently.
+        if sum(isinstance(bag, str) for bag in bags) > 1:
+            loaded_bags = list(_get_load_pool().map(self._load_one, bags))
+        else:
+            loaded_bags = [self._load_one(bag) for bag in bags]
 
         # Sample a subset, if required
         if self.bag_size:
@@ -243,6 +393,19 @@ class MapDataset(Dataset):
     def __getitem__(self, index: int) -> Any:
         return self.func(*[ds[index] for ds in self._datasets])
 
+    def __getitems__(self, indices: List[int]) -> List[Any]:
+        """Fetch a batch of items (used by PyTorch >= 2.0 DataLoaders).
+
+        Underlying datasets which support batched fetching are queried once
+        for all indices, rather than once per index.
+        """
+        columns = [
+            (ds.__getitems__(indices) if hasattr(ds, '__getitems__')
+             else [ds[i] for i in indices])
+            for ds in self._datasets
+        ]
+        return [self.func(*row) for row in zip(*columns)]
+
     def new_empty(self):
         # FIXME hack to appease fastai's export
         return self
@@ -265,14 +428,45 @@ class EncodedDataset(MapDataset):
         """A dataset which first encodes its input data.
         This class is can be useful with classes such as fastai, where the
         encoder is saved as part of the model.
+        Encoded items are returned with singleton dimensions removed.
         Args:
             encode:  an sklearn encoding to encode the data with.
             values:  data to encode.
         """
-        super().__init__(self._unsqueeze_to_float32, values)
+        super().__init__(self._encode_to_float32, values)
         self.encode = encode
+        self._encoded = self._encode_all(values)
 
-    def _unsqueeze_to_float32(self, x):
+    def _encode_all(self, values: npt.NDArray) -> Optional[torch.Tensor]:
+        """Encode all values with a single call to the encoder.
+
+        Returns a float32 tensor of shape (N, C), or (N,) if C is 1, or None
+        if the encoder does not support batched transforms.
+        """
+        try:
+            arr = np.asarray(values)
+            encoded = self.encode.transform(arr.reshape(len(arr), -1))
+        except (ValueError, TypeError):
+            return None
+        if hasattr(encoded, 'toarray'):
+            encoded = encoded.toarray()
+        encoded = np.asarray(encoded, dtype=np.float32)
+        encoded = torch.from_numpy(encoded)
+        if encoded.shape[1] == 1:
+            encoded = encoded[:, 0]
+        return encoded
+
+    def __getitem__(self, index: int) -> torch.Tensor:
+        if self._encoded is not None:
+            return self._encoded[index]
+        return super().__getitem__(index)
+
+    def __getitems__(self, indices: List[int]) -> List[torch.Tensor]:
+        if self._encoded is not None:
+            return list(self._encoded[torch.as_tensor(indices)])
+        return super().__getitems__(indices)
+
+    def _encode_to_float32(self, x):
         return torch.tensor(
             self.encode.transform(np.array(x).reshape(1, -1)), dtype=torch.float32
-        )
\ No newline at end of file
+        ).squeeze()
\ No newline at end of file
@@ -1008,7 +1008,7 @@ def _predict_clam(
             # If bags are passed as a list of paths, load them individually.
             loaded = torch.cat([utils._load_bag(b).to(device) for b in bag], dim=0)
         else:
-            loaded = utils._load_bag(bag).to(device)
+            loaded = utils._load_bag(bag).to(device, non_blocking=True)
         with torch.no_grad():
             if clam_kw:
                 logits, att, _ = model(loaded, **clam_kw)
@@ -1048,7 +1048,7 @@ def _predict_mil(
             # If bags are passed as a list of paths, load them individually.
             loaded = torch.cat([utils._load_bag(b).to(device) for b in bag], dim=0)
         else:
-            loaded = utils._load_bag(bag).to(device)
+            loaded = utils._load_bag(bag).to(device, non_blocking=True)
         loaded = torch.unsqueeze(loaded, dim=0)
 
         with torch.no_grad():
@@ -1112,7 +1112,7 @@ def _predict_mil_tiles(
         # If bags are passed as a list of paths, load them individually.
         loaded = torch.cat([utils._load_bag(b).to(device) for b in bag], dim=0)
     else:
-        loaded = utils._load_bag(bag).to(device)
+        loaded = utils._load_bag(bag).to(device, non_blocking=True)
 
     # Resize the bag dimension to the batch dimension.
     loaded = torch.unsqueeze(loaded, dim=1)
@@ -160,33 +160,26 @@ def read_hp_sweep(
     if models is not None and not isinstance(models, list):
         raise ValueError("If supplying models, must be list(str) "
                          "with model names.")
-    if isinstance(models, list) and not list(set(models)) == models:
+    models_set = set(models) if models else None
+    if models_set is not None and len(models_set) != len(models):  # type: ignore
         raise ValueError("Duplicate model names provided.")
 
     hp_list = sf.util.load_json(filename)
 
-    # First, ensure all indicated models are in the batch train file
-    if models:
-        valid_models = []
-        for hp_dict in hp_list:
-            model_name = list(hp_dict.keys())[0]
-            if ((not models)
-               or (isinstance(models, str) and model_name == models)
-               or model_name in models):
-                valid_models += [model_name]
-        missing = [m for m in models if m not in valid_models]
-        if missing:
-            raise ValueError(f"Unable to find models {', '.join(missing)}")
-    else:
-        valid_models = [list(hp_dict.keys())[0] for hp_dict in hp_list]
-
-    # Read the batch train file and generate HyperParameter objects
-    # from the given configurations
+    # Generate HyperParameter objects from the requested configurations
+    # in a single pass, then ensure all indicated models were found.
     loaded = {}
     for hp_dict in hp_list:
         name = list(hp_dict.keys())[0]
-        if name in valid_models:
+        if models_set is None or name in models_set:
             loaded.update({
                 name: ModelParams.from_dict(hp_dict[name])
             })
+            # Stop once all requested models have been loaded
+            if models_set is not None and len(loaded) == len(models_set):
+                break
+    if models_set is not None:
+        missing = [m for m in models if m not in loaded]
+        if missing:
+            raise ValueError(f"Unable to find models {', '.join(missing)}")
     return loaded  # type: ignore
@@ -22,6 +22,25 @@ class _ModelParams:
     LinearLossDict = {}  # type: Dict
     AllLossDict = {}  # type: Dict
 
+    # Public attributes which are not hyperparameters.
+    _IgnoredArgs = frozenset((
+        'get_opt',
+        'build_model',
+        'model_type',
+        'validate',
+        'to_dict',
+        'from_dict',
+        'get_dict',
+        'get_loss',
+        'get_normalizer',
+        'load_dict',
+        'OptDict',
+        'ModelDict',
+        'LinearLossDict',
+        'AllLossDict',
+        'get_model_loader'
+    ))
+
     def __init__(
         self,
         *,
@@ -245,28 +264,10 @@ class _ModelParams:
             self._loss = l
 
     def _get_args(self) -> List[str]:
-        to_ignore = [
-            'get_opt',
-            'build_model',
-            'model_type',
-            'validate',
-            'to_dict',
-            'from_dict',
-            'get_dict',
-            'get_loss',
-            'get_normalizer',
-            'load_dict',
-            'OptDict',
-            'ModelDict',
-            'LinearLossDict',
-            'AllLossDict',
-            'get_model_loader'
-        ]
-        args = [
+        return [
             arg for arg in dir(self)
-            if arg[0] != '_' and arg not in to_ignore
+            if arg[0] != '_' and arg not in self._IgnoredArgs
         ]
-        return args
 
     def get_dict(self) -> Dict[str, Any]:
         """Deprecated. Alias of ModelParams.to_dict()."""
@@ -291,13 +292,18 @@ class _ModelParams:
             return sf.norm.autoselect(self.normalizer, self.normalizer_source, **kwargs)
 
     def load_dict(self, hp_dict: Dict[str, Any]) -> None:
+        unrecognized = [key for key in hp_dict if not hasattr(self, key)]
+        if unrecognized:
+            log.error('Unrecognized hyperparameters {}; unable to load'.format(
+                ', '.join(unrecognized)
+            ))
         for key, value in hp_dict.items():
-            if not hasattr(self, key):
-                log.error(f'Unrecognized hyperparameter {key}; unable to load')
+            if key in unrecognized:
+                continue
             try:
                 setattr(self, key, value)
             except Exception:
-                log.error(f'Error setting hyperparameter {key} to {value}; unable to hyperparameters')
+                log.error(f'Error setting hyperparameter {key} to {value}; unable to load hyperparameter')
         self.validate()
 
     def _detect_classes_from_labels(
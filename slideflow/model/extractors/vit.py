@@ -20,59 +20,23 @@ Most code comes from the timm library: https://github.com/rwightman/pytorch-imag
 
 import math
 import torch
-import warnings
 
 from typing import Optional, List, Dict, Any, Tuple, Union
 from torch import nn
+from torch.nn import functional as F
 from torchvision import transforms
 from functools import partial
 
 from slideflow.model import torch_utils
+from slideflow.util import log
 
 from ._factory_torch import TorchFeatureExtractor
 
 # -----------------------------------------------------------------------------
 
-def _no_grad_trunc_normal_(tensor, mean, std, a, b):
-    
-    # Cut & paste from PyTorch official master until it's in a few official releases - RW
-    # Method based on https://people.sc.fsu.edu/~jburkardt/presentations/truncated_normal.pdf
-    def norm_cdf(x):
-        # Computes standard normal cumulative distribution function
-        return (1. + math.erf(x / math.sqrt(2.))) / 2.
-
-    if (mean < a - 2 * std) or (mean > b + 2 * std):
-        warnings.warn("mean is more than 2 std from [a, b] in nn.init.trunc_normal_. "
-                      "The distribution of values may be incorrect.",
-                      stacklevel=2)
-
-    with torch.no_grad():
-        # Values are generated by using a truncated uniform distribution and
-        # then using the inverse CDF for the normal distribution.
-        # Get upper and lower cdf values
-        l = norm_cdf((a - mean) / std)
-        u = norm_cdf((b - mean) / std)
-
-        # Uniformly fill tensor with values from [l, u], then translate to
-        # [2l-1, 2u-1].
-        tensor.uniform_(2 * l - 1, 2 * u - 1)
-
-        # Use inverse cdf transform for normal distribution to get truncated
-        # standard normal
-        tensor.erfinv_()
-
-        # Transform to proper mean, std
-        tensor.mul_(std * math.sqrt(2.))
-        tensor.add_(mean)
-
-        # Clamp to ensure it's in the proper range
-        tensor.clamp_(min=a, max=b)
-        return tensor
-
-
 def trunc_normal_(tensor, mean=0., std=1., a=-2., b=2.):
     # type: (Tensor, float, float, float, float) -> Tensor
-    return _no_grad_trunc_normal_(tensor, mean, std, a, b)
+    return nn.init.trunc_normal_(tensor, mean=mean, std=std, a=a, b=b)
 
 
 def drop_path(x, drop_prob: float = 0., training: bool = False):
@@ -138,18 +102,38 @@ class Attention(nn.Module):
         self.num_heads = num_heads
         head_dim = dim // num_heads
         self.scale = qk_scale or head_dim ** -0.5
+        # Ratio of the requested scale to the default scale used by
+        # F.scaled_dot_product_attention.
+        self._sdpa_q_scale = self.scale / (head_dim ** -0.5)
 
         self.qkv = nn.Linear(dim, dim * 3, bias=qkv_bias)
         self.attn_drop = nn.Dropout(attn_drop)
         self.proj = nn.Linear(dim, dim)
         self.proj_drop = nn.Dropout(proj_drop)
 
-    def forward(self, x: torch.Tensor) -> torch.Tensor:
+    def forward(
+        self,
+        x: torch.Tensor,
+        return_attention: bool = False
+    ) -> Tuple[torch.Tensor, Optional[torch.Tensor]]:
         B, N, C = x.shape
         qkv = self.qkv(x).reshape(B, N, 3, self.num_heads, C // self.num_heads)
         qkv = qkv.permute(2, 0, 3, 1, 4)
         q, k, v = qkv[0], qkv[1], qkv[2]
 
+        if not return_attention and hasattr(F, 'scaled_dot_product_attention'):
+            # Fused attention kernel; the attention matrix is not materialized.
+            if self._sdpa_q_scale != 1:
+                q = q * self._sdpa_q_scale
+            x = F.scaled_dot_product_attention(
+                q, k, v,
+                dropout_p=(self.attn_drop.p if self.training else 0.)
+            )
+            x = x.transpose(1, 2).reshape(B, N, C)
+            x = self.proj(x)
+            x = self.proj_drop(x)
+            return x, None
+
         attn = (q @ k.transpose(-2, -1)) * self.scale
         attn = attn.softmax(dim=-1)
         attn = self.attn_drop(attn)
@@ -184,7 +168,7 @@ class Block(nn.Module):
         self.mlp = Mlp(in_features=dim, hidden_features=mlp_hidden_dim, act_layer=act_layer, drop=drop)
 
     def forward(self, x: torch.Tensor, return_attention: bool = False) -> torch.Tensor:
-        y, attn = self.attn(self.norm1(x))
+        y, attn = self.attn(self.norm1(x), return_attention=return_attention)
         if return_attention:
             return attn
         x = x + self.drop_path(y)
@@ -261,6 +245,9 @@ class VisionTransformer(nn.Module):
         trunc_normal_(self.cls_token, std=.02)
         self.apply(self._init_weights)
 
+        # Cache of interpolated positional encodings, used for inference.
+        self._pos_cache = {}  # type: Dict[Tuple, torch.Tensor]
+
     def _init_weights(self, m: nn.Module) -> None:
         if isinstance(m, nn.Linear):
             trunc_normal_(m.weight, std=.02)
@@ -275,6 +262,19 @@ class VisionTransformer(nn.Module):
         N = self.pos_embed.shape[1] - 1
         if npatch == N and w == h:
             return self.pos_embed
+        if torch.is_grad_enabled():
+            return self._interpolate_pos_encoding(x, w, h)
+        # The key includes the parameter version counter, so the cache is
+        # invalidated if the positional embedding is modified in-place
+        # (e.g. when loading a state dict).
+        key = (w, h, npatch, self.pos_embed._version, self.pos_embed.device)
+        if key not in self._pos_cache:
+            self._pos_cache.clear()
+            self._pos_cache[key] = self._interpolate_pos_encoding(x, w, h)
+        return self._pos_cache[key]
+
+    def _interpolate_pos_encoding(self, x: torch.Tensor, w: int, h: int) -> torch.Tensor:
+        N = self.pos_embed.shape[1] - 1
         class_pos_embed = self.pos_embed[:, 0]
         patch_pos_embed = self.pos_embed[:, 1:]
         dim = x.shape[-1]
@@ -294,14 +294,16 @@ class VisionTransformer(nn.Module):
 
     def prepare_tokens(self, x: torch.Tensor) -> torch.Tensor:
         B, nc, w, h = x.shape
-        x = self.patch_embed(x)  # patch linear embedding
+        patches = self.patch_embed(x)  # patch linear embedding
 
-        # add the [CLS] token to the embed patch tokens
-        cls_tokens = self.cls_token.expand(B, -1, -1)
-        x = torch.cat((cls_tokens, x), dim=1)
+        # add the [CLS] token to the embed patch tokens, writing both
+        # directly into a preallocated token tensor
+        x = patches.new_empty(B, patches.shape[1] + 1, patches.shape[2])
+        x[:, :1].copy_(self.cls_token.expand(B, -1, -1))
+        x[:, 1:].copy_(patches)
 
         # add positional encoding to each token
-        x = x + self.interpolate_pos_encoding(x, w, h)
+        x.add_(self.interpolate_pos_encoding(x, w, h))
 
         return self.pos_drop(x)
 
@@ -391,8 +393,23 @@ class ViTFeatures(TorchFeatureExtractor):
         'base': vit_base
     }
 
-    def __init__(self, size, weights, device=None, center_crop=False, resize=False, **kwargs):
-        super().__init__()
+    def __init__(
+        self,
+        size,
+        weights,
+        device=None,
+        center_crop=False,
+        resize=False,
+        compile=False,
+        cuda_graph=False,
+        channels_last=False,
+        mixed_precision=False,
+        **kwargs
+    ):
+        super().__init__(
+            channels_last=channels_last,
+            mixed_precision=mixed_precision
+        )
 
         if size not in self.sizes:
             raise ValueError("Unrecognized size '{}'. Expected one of: {}".format(
@@ -406,6 +423,8 @@ class ViTFeatures(TorchFeatureExtractor):
         self.model = self.sizes[size](**kwargs)
         self.model.load_state_dict(load_pretrained_weights(weights), strict=False)
         self.model.to(self.device)
+        if channels_last:
+            self.model.to(memory_format=torch.channels_last)
         self.model.eval()
 
         # ---------------------------------------------------------------------
@@ -416,17 +435,49 @@ class ViTFeatures(TorchFeatureExtractor):
             all_transforms = [transforms.Resize(self.model.img_size)]
         else:
             all_transforms = []
+        # Scaling to [0, 1] and normalization are fused into a single
+        # affine transform: (x / 255 - mean) / std = x * scale + shift
+        mean = torch.tensor((0.485, 0.456, 0.406)).view(3, 1, 1)
+        std = torch.tensor((0.229, 0.224, 0.225)).view(3, 1, 1)
+        scale = (1. / (255. * std)).to(self.device)
+        shift = (-mean / std).to(self.device)
         all_transforms += [
-            transforms.Lambda(lambda x: x / 255.),
-            transforms.Normalize(
-                mean=(0.485, 0.456, 0.406),
-                std=(0.229, 0.224, 0.225)),
+            transforms.Lambda(
+                lambda x: torch.addcmul(
+                    shift.to(x.device), x.float(), scale.to(x.device)
+                )
+            ),
         ]
         self.transform = transforms.Compose(all_transforms)
         self.preprocess_kwargs = dict(standardize=False)
         self._center_crop = center_crop
+        if compile:
+            self.model = self._compile(self.model, dynamic=not (center_crop or resize))
+        if cuda_graph:
+            # Replay the forward pass as a single CUDA graph for batches
+            # matching the first captured batch shape. Outputs are cloned
+            # from the graph's static buffers.
+            self.model = torch_utils.CUDAGraphModule(self.model)
         # ---------------------------------------------------------------------
 
+    @staticmethod
+    def _compile(model: nn.Module, dynamic: bool = False) -> nn.Module:
+        """Compile the model with torch.compile (PyTorch >= 2.0).
+
+        Input shapes are static when images are cropped or resized to the
+        model input size; otherwise, dynamic shapes are enabled. The default
+        compile mode is used, as outputs may be read after later batches
+        have run, and CUDA graphs from 'reduce-overhead' reuse output
+        buffers between calls.
+        """
+        if not hasattr(torch, 'compile'):
+            log.warning(
+                "torch.compile requires PyTorch >= 2.0; model will not be "
+                "compiled."
+            )
+            return model
+        return torch.compile(model, dynamic=dynamic)
+
     def dump_config(self):
         """Return a dictionary of configuration parameters.
 
@@ -6,9 +6,8 @@ import sys
 import threading
 import time
 import warnings
-import multiprocessing as mp
 from collections import defaultdict
-from math import isnan
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from os.path import exists, join
 from typing import (
     TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union, Iterable, Callable
@@ -74,12 +73,24 @@ class DatasetFeatures:
             cache (str, optional): File for PKL cache.
 
         Keyword Args:
+            allow_tf32 (bool): Allow PyTorch to use Tensorfloat-32 for
+                matmul and convolutions, and enable cuDNN autotuning for the
+                fixed tile input shape. Faster on Ampere or newer GPUs, but
+                results are no longer bit-exact with float32.
+                Only used for PyTorch feature extractors. Defaults to False.
             augment (bool, str, optional): Whether to use data augmentation
                 during feature extraction. If True, will use default
                 augmentation. If str, will use augmentation specified by the
                 string. Defaults to None.
             batch_size (int): Batch size for activations calculations.
                 Defaults to 32.
+            compile (bool): Compile stain normalization and feature
+                extraction with ``torch.compile`` (PyTorch >= 2.0).
+                Only used for PyTorch feature extractors. Defaults to False.
+            cuda_graph (bool): Capture stain normalization and feature
+                extraction into a CUDA graph, replayed for each full batch.
+                Only used for PyTorch feature extractors on CUDA devices.
+                May be combined with ``compile``. Defaults to False.
             device (str, optional): Device to use for feature extraction.
                 Only used for PyTorch feature extractors. Defaults to None.
             include_preds (bool): Calculate and store predictions.
@@ -104,8 +115,8 @@ class DatasetFeatures:
             num_workers (int, optional): Number of workers to use for feature
                 extraction. Only used for PyTorch feature extractors. Defaults
                 to None.
-            pool_sort (bool): Use multiprocessing pools to perform final
-                sorting. Defaults to True.
+            pool_sort (bool): Use a thread pool to read TFRecord locations
+                during final sorting. Defaults to True.
             progress (bool): Show a progress bar during feature calculation.
                 Defaults to True.
             verbose (bool): Show verbose logging output. Defaults to True.
@@ -182,6 +193,7 @@ class DatasetFeatures:
         self.model = model
         self.dataset = dataset
         self.feature_generator = None
+        self._category_cache = None  # type: Optional[Tuple]
         if dataset is not None:
             self.tile_px = dataset.tile_px
             self.manifest = dataset.manifest()
@@ -192,6 +204,9 @@ class DatasetFeatures:
             self.tile_px = None
             self.manifest = dict()
             self.tfrecords = []
+        self._tfr_by_slide = {
+            sf.util.path_to_name(t): t for t in self.tfrecords
+        }  # type: Dict[str, str]
         self.slides = sorted([sf.util.path_to_name(t) for t in self.tfrecords])
 
         if labels is not None and annotations is not None:
@@ -209,24 +224,11 @@ class DatasetFeatures:
         else:
             self.labels = labels
 
+        self.used_categories = []  # type: List[Union[str, int, List[float]]]
         if self.labels:
             self.categories = list(set(self.labels.values()))
-            if self.activations:
-                for slide in self.slides:
-                    try:
-                        if self.activations[slide]:
-                            used = (self.used_categories
-                                    + [self.labels[slide]])
-                            self.used_categories = list(set(used))  # type: List[Union[str, int, List[float]]]
-                            self.used_categories.sort()
-                    except KeyError:
-                        raise KeyError(f"Slide {slide} not in labels.")
-                total = len(self.used_categories)
-                cat_list = ", ".join([str(c) for c in self.used_categories])
-                log.debug(f'Observed categories (total: {total}): {cat_list}')
         else:
             self.categories = []
-            self.used_categories = []
 
         # Load from PKL (cache) if present
         if cache and exists(cache):
@@ -238,8 +240,9 @@ class DatasetFeatures:
 
         # Now delete slides not included in our filtered TFRecord list
         loaded_slides = list(self.activations.keys())
+        slides_set = set(self.slides)
         for loaded_slide in loaded_slides:
-            if loaded_slide not in self.slides:
+            if loaded_slide not in slides_set:
                 log.debug(
                     f'Removing activations from slide {loaded_slide} '
                     'slide not in the filtered tfrecords list'
@@ -263,11 +266,9 @@ class DatasetFeatures:
 
         # Record which categories have been included in the specified tfrecords
         if self.categories and self.labels:
-            self.used_categories = list(set([
-                self.labels[slide]
-                for slide in self.slides
-            ]))
-            self.used_categories.sort()
+            self.used_categories = sorted(set(
+                self.labels[slide] for slide in self.slides
+            ))
 
         total = len(self.used_categories)
         cat_list = ", ".join([str(c) for c in self.used_categories])
@@ -298,28 +299,25 @@ class DatasetFeatures:
         """
         obj = cls(None, None)  # type: ignore
         obj.slides = df.slide.unique().tolist()
+
+        # Row positions for each slide, computed in a single pass.
+        slide_rows = df.groupby('slide', sort=False, observed=True).indices
+
+        def _stack_by_slide(col):
+            values = df[col].values
+            return {s: np.stack(values[slide_rows[s]]) for s in obj.slides}
+
         if 'activations' in df.columns:
-            obj.activations = {
-                s: np.stack(df.loc[df.slide==s].activations.values)
-                for s in obj.slides
-            }
-            obj.num_features = next(df.iterrows())[1].activations.shape[0]
+            obj.activations = _stack_by_slide('activations')
+            obj.num_features = df['activations'].iloc[0].shape[0]
         if 'locations' in df.columns:
-            obj.locations = {
-                s: np.stack(df.loc[df.slide==s].locations.values)
-                for s in obj.slides
-            }
+            obj.locations = _stack_by_slide('locations')
         if 'uncertainty' in df.columns:
-            obj.uncertainty = {
-                s: np.stack(df.loc[df.slide==s].uncertainty.values)
-                for s in obj.slides
-            }
+            obj.uncertainty = _stack_by_slide('uncertainty')
         if 'predictions' in df.columns:
-            obj.predictions = {
-                s: np.stack(df.loc[df.slide==s].predictions.values)
-                for s in obj.slides
-            }
-            obj.num_classes = next(df.iterrows())[1].predictions.shape[0]
+            obj.predictions = _stack_by_slide('predictions')
+            obj.num_classes = df['predictions'].iloc[0].shape[0]
+        obj.reset_category_cache()
         return obj
 
     @classmethod
@@ -334,13 +332,34 @@ class DatasetFeatures:
 
         """
         import torch
-        slides = [sf.util.path_to_name(b) for b in os.listdir(bags) if b.endswith('.pt')]
+        from packaging import version
+
+        # Memory-map bags when supported (PyTorch >= 2.1), so that
+        # activations are only read from disk as they are accessed.
+        if version.parse(torch.__version__) >= version.parse("2.1"):
+            load_kw = dict(mmap=True, weights_only=True)
+        else:
+            load_kw = dict()
+
+        with os.scandir(bags) as it:
+            slides = [
+                sf.util.path_to_name(entry.name) for entry in it
+                if entry.name.endswith('.pt')
+            ]
+
+        def _load(slide):
+            activations = torch.load(join(bags, f'{slide}.pt'), **load_kw)
+            locations = tfrecord2idx.load_index(join(bags, f'{slide}.index'))
+            return activations.numpy(), locations
+
         obj = cls(None, None)
         obj.slides = slides
-        for slide in slides:
-            activations = torch.load(join(bags, f'{slide}.pt'))
-            obj.activations[slide] = activations.numpy()
-            obj.locations[slide] = tfrecord2idx.load_index(join(bags, f'{slide}.index'))
+        n_workers = min(32, sf.util.num_cpu(default=8) * 2)
+        with ThreadPoolExecutor(n_workers) as pool:
+            for slide, (acts, locs) in zip(slides, pool.map(_load, slides)):
+                obj.activations[slide] = acts
+                obj.locations[slide] = locs
+        obj.reset_category_cache()
         return obj
 
     @classmethod
@@ -377,48 +396,63 @@ class DatasetFeatures:
                 >>> df = DatasetFeatures.concat([df1, df2])
 
         """
+        args = list(args)
         assert len(args) > 1
-        dfs = []
-        for f, ftrs in enumerate(args):
-            log.debug(f"Creating dataframe {f} from features...")
-            dfs.append(ftrs.to_df())
-        if not all([len(df) == len(dfs[0]) for df in dfs]):
+        lengths = [
+            sum(len(ftrs.locations[s]) for s in ftrs.slides if s in ftrs.locations)
+            for ftrs in args
+        ]
+        if not all([n == lengths[0] for n in lengths]):
             raise ValueError(
                 "Unable to concatenate DatasetFeatures of different lengths "
-                f"(got: {', '.join([str(len(_df)) for _df in dfs])})"
+                f"(got: {', '.join([str(n) for n in lengths])})"
             )
-        log.debug(f"Created {len(dfs)} dataframes")
-        for i in range(len(dfs)):
-            log.debug(f"Mapping tuples for df {i}")
-            dfs[i]['locations'] = dfs[i]['locations'].map(tuple)
-        for i in range(1, len(dfs)):
-            log.debug(f"Merging dataframe {i}")
-            dfs[0] = pd.merge(
-                dfs[0],
-                dfs[i],
-                how='inner',
-                left_on=['slide', 'locations', 'tfr_index'],
-                right_on=['slide', 'locations', 'tfr_index'],
-                suffixes=['_1', '_2']
+
+        # Inner join on (slide, location, TFRecord index). As the TFRecord
+        # index is the row index within each slide, tiles are matched by
+        # comparing locations row-wise, and matched rows are already
+        # sorted by TFRecord index.
+        obj = cls(None, None)  # type: ignore
+        obj.slides = []
+        obj.activations = {}
+        obj.locations = {}
+        slide_sets = [set(ftrs.slides) for ftrs in args[1:]]
+        for slide in args[0].slides:
+            if (not all(slide in ss for ss in slide_sets)
+               or not all(slide in ftrs.locations for ftrs in args)):
+                continue
+            n = min(len(ftrs.locations[slide]) for ftrs in args)
+            if not n:
+                continue
+            # Compare locations as packed int64 keys.
+            keys = [_location_keys(ftrs.locations[slide][:n]) for ftrs in args]
+            matched = np.ones(n, dtype=bool)
+            for k in keys[1:]:
+                matched &= (k == keys[0])
+            rows = np.flatnonzero(matched)
+            if not len(rows):
+                continue
+            if len(rows) == n:
+                rows = slice(0, n)  # type: ignore
+            # Write each feature block directly into one contiguous matrix.
+            acts = [ftrs.activations[slide] for ftrs in args]
+            widths = [a.shape[-1] for a in acts]
+            combined = np.empty(
+                (n if isinstance(rows, slice) else len(rows), sum(widths)),
+                dtype=np.result_type(*acts)
             )
-            log.debug("Dropping merged columns")
-            to_drop = [c for c in dfs[0].columns
-                       if ('predictions' in c or 'uncertainty' in c)]
-            dfs[0].drop(columns=to_drop, inplace=True)
-            log.debug("Concatenating activations")
-            act1 = np.stack(dfs[0]['activations_1'].values)
-            act2 = np.stack(dfs[0]['activations_2'].values)
-            log.debug(f"Act 1 shape: {act1.shape}")
-            log.debug(f"Act 2 shape: {act2.shape}")
-            concatenated = np.concatenate((act1, act2), axis=1)
-            as_list = [_c for _c in concatenated]
-            dfs[0]['activations'] = as_list
-            log.debug("Dropping old columns")
-            dfs[0].drop(columns=['activations_1', 'activations_2'], inplace=True)
-        log.debug("Sorting by TFRecord index")
-        dfs[0].sort_values('tfr_index', inplace=True)
-        log.debug("Creating DatasetFeatures object")
-        return DatasetFeatures.from_df(dfs[0])
+            start = 0
+            for a, w in zip(acts, widths):
+                combined[:, start:start+w] = a[rows]
+                start += w
+            obj.slides.append(slide)
+            obj.locations[slide] = np.asarray(args[0].locations[slide])[rows]
+            obj.activations[slide] = combined
+        if obj.slides:
+            obj.num_features = obj.activations[obj.slides[0]].shape[-1]
+        obj.reset_category_cache()
+        log.debug(f"Concatenated features from {len(obj.slides)} slides")
+        return obj
 
     @property
     def uq(self) -> bool:
@@ -460,8 +494,8 @@ class DatasetFeatures:
             progress (bool): Show a progress bar during feature calculation.
                 Defaults to True.
             verbose (bool): Show verbose logging output. Defaults to True.
-            pool_sort (bool): Use multiprocessing pools to perform final
-                sorting. Defaults to True.
+            pool_sort (bool): Use a thread pool to read TFRecord locations
+                during final sorting. Defaults to True.
             cache (str, optional): File in which to store PKL cache.
         """
 
@@ -480,10 +514,11 @@ class DatasetFeatures:
             progress=progress, pb=pb, verbose=verbose
         )
 
-        self.activations = {s: np.stack(v) for s, v in activations.items()}
-        self.predictions = {s: np.stack(v) for s, v in predictions.items()}
-        self.locations = {s: np.stack(v) for s, v in locations.items()}
-        self.uncertainty = {s: np.stack(v) for s, v in uncertainty.items()}
+        self.activations = activations
+        self.predictions = predictions
+        self.locations = locations
+        self.uncertainty = uncertainty
+        self.reset_category_cache()
 
         # Sort using TFRecord location information,
         # to ensure dictionary indices reflect TFRecord indices
@@ -496,8 +531,8 @@ class DatasetFeatures:
                     or not self.uncertainty[s].size)
             ]
             if pool_sort and len(slides_to_sort) > 1:
-                pool = mp.Pool(sf.util.num_cpu())
-                imap_iterable = pool.imap(
+                pool = ThreadPoolExecutor(sf.util.num_cpu(default=8))
+                imap_iterable = pool.map(
                     self.dataset.get_tfrecord_locations, slides_to_sort
                 )
             else:
@@ -514,28 +549,29 @@ class DatasetFeatures:
             else:
                 iterable = imap_iterable
 
-            for i, true_locs in enumerate(iterable):
-                slide = slides_to_sort[i]
+            for slide, true_locs in zip(slides_to_sort, iterable):
                 # Get the order of locations stored in TFRecords,
                 # and the corresponding indices for sorting
                 cur_locs = self.locations[slide]
-                idx = [true_locs.index(tuple(cur_locs[i])) for i in range(cur_locs.shape[0])]
+                idx = _match_locations(cur_locs, true_locs)
 
                 # Make sure that the TFRecord indices are continuous, otherwise
                 # our sorted indices will be inaccurate
-                assert max(idx)+1 == len(idx)
+                assert idx.max()+1 == len(idx)
+
+                # Skip reindexing if tiles are already in TFRecord order.
+                if (np.diff(idx) == 1).all():
+                    continue
 
                 # Final sorting
-                sorted_idx = np.argsort(idx)
-                if slide in self.activations:
-                    self.activations[slide] = self.activations[slide][sorted_idx]
-                if slide in self.predictions:
-                    self.predictions[slide] = self.predictions[slide][sorted_idx]
-                if slide in self.uncertainty:
-                    self.uncertainty[slide] = self.uncertainty[slide][sorted_idx]
-                self.locations[slide] = self.locations[slide][sorted_idx]
+                sorted_idx = np.argsort(idx, kind='stable')
+                for data in (self.activations, self.predictions, self.uncertainty):
+                    arr = data.get(slide)
+                    if arr is not None:
+                        data[slide] = arr[sorted_idx]
+                self.locations[slide] = cur_locs[sorted_idx]
             if pool is not None:
-                pool.close()
+                pool.shutdown()
 
         fla_calc_time = time.time()
         log.debug(f'Calculation time: {fla_calc_time-fla_start_time:.0f} sec')
@@ -566,13 +602,65 @@ class DatasetFeatures:
                 'Unable to calculate by category; annotations not provided.'
             )
 
-        def act_by_cat(c):
-            return np.concatenate([
-                self.activations[pt][:, idx]
-                for pt in self.slides
-                if self.labels[pt] == c
-            ])
-        return {c: act_by_cat(c) for c in self.used_categories}
+        return {c: acts[:, idx] for c, acts in self._activations_by_category().items()}
+
+    def _activations_by_category(self) -> Dict[Any, np.ndarray]:
+        """Return all tile activations grouped by category.
+
+        Arrays are views into the stacked activations from
+        :meth:`DatasetFeatures._stacked_activations`.
+        """
+        self._stacked_activations()
+        return self._category_cache[4]  # type: ignore
+
+    def reset_category_cache(self) -> None:
+        """Reset cached activations used for category-level statistics.
+
+        Activations stacked by category are cached for
+        :meth:`DatasetFeatures.activations_by_category`,
+        :meth:`DatasetFeatures.box_plots`, and :meth:`DatasetFeatures.stats`.
+        Call this after modifying ``activations`` directly.
+        """
+        self._category_cache = None
+
+    def _stacked_activations(self) -> Tuple[np.ndarray, List[str], np.ndarray]:
+        """Return tile activations from all slides stacked into one array.
+
+        Slides are ordered by category (following ``used_categories``), so
+        that activations for each category are a contiguous slice.
+
+        Returns the stacked activations, the slide order, and row offsets
+        for each slide (of length ``len(slides) + 1``). The result is cached,
+        and rebuilt if slides, labels, or categories have changed. Methods
+        that replace activations reset the cache; if activations are
+        modified directly, call :meth:`DatasetFeatures.reset_category_cache`.
+        """
+        key = (
+            tuple(self.used_categories),
+            tuple((s, self.labels[s]) for s in self.slides)
+        )
+        if self._category_cache is None or self._category_cache[0] != key:
+            rank = {c: i for i, c in enumerate(self.used_categories)}
+            order = sorted(
+                self.slides,
+                key=lambda s: rank.get(self.labels[s], len(rank))
+            )
+            offsets = np.cumsum(
+                [0] + [len(self.activations[s]) for s in order]
+            )
+            if order:
+                stacked = np.concatenate([self.activations[s] for s in order])
+            else:
+                stacked = np.empty((0, self.num_features), dtype=np.float32)
+            by_cat = {}
+            for c in self.used_categories:
+                idx = [i for i, s in enumerate(order) if self.labels[s] == c]
+                if idx:
+                    by_cat[c] = stacked[offsets[idx[0]]:offsets[idx[-1]+1]]
+                else:
+                    by_cat[c] = stacked[:0]
+            self._category_cache = (key, stacked, order, offsets, by_cat)
+        return self._category_cache[1:4]  # type: ignore
 
     def box_plots(self, features: List[int], outdir: str) -> None:
         """Generates plots comparing node activations at slide- and tile-level.
@@ -647,20 +735,27 @@ class DatasetFeatures:
         )
         self.to_torch(*args, **kwargs)
 
-    def save_cache(self, path: str):
+    def save_cache(self, path: str, dtype: Optional[str] = None):
         """Cache calculated activations to file.
 
         Args:
             path (str): Path to pkl.
+            dtype (str, optional): Store activations with reduced precision
+                to reduce the cache size. Either 'float16' or 'int8'
+                (per-feature linear quantization, per slide). With 'int8',
+                the reconstruction error is at most half a quantization step,
+                ``(max - min) / 510`` for each feature. Activations are
+                converted back to float32 when loaded. If None, activations
+                are stored as-is, and are loaded bit-exact. Defaults to None.
         """
-        with open(path, 'wb') as pt_pkl_file:
-            pickle.dump(
-                [self.activations,
-                 self.predictions,
-                 self.uncertainty,
-                 self.locations],
-                pt_pkl_file
-            )
+        data = [self.activations,
+                self.predictions,
+                self.uncertainty,
+                self.locations]
+        if dtype is not None:
+            data[0], quant = _quantize_activations(self.activations, dtype)
+            data.append(quant)
+        _dump_cache(data, path)
         log.info(f'Data cached to [green]{path}')
 
     def to_csv(
@@ -688,63 +783,86 @@ class DatasetFeatures:
         slides = self.slides if not slides else slides
 
         with open(filename, 'w') as outfile:
-            csvwriter = csv.writer(outfile)
+            csvwriter = csv.writer(outfile, lineterminator='\n')
             logit_header = [f'Class_{log}' for log in range(self.num_classes)]
             feature_header = [f'Feature_{f}' for f in range(self.num_features)]
             header = ['Slide'] + logit_header + feature_header
             csvwriter.writerow(header)
-            for slide in track(slides):
-                if level == 'tile':
-                    for i, tile_act in enumerate(self.activations[slide]):
-                        if self.num_classes and self.predictions[slide] != []:
-                            csvwriter.writerow(
-                                [slide]
-                                + self.predictions[slide][i].tolist()
-                                + tile_act.tolist()
-                            )
-                        else:
-                            csvwriter.writerow([slide] + tile_act.tolist())
-                else:
-                    act = meth_fn[method](
-                        self.activations[slide],
-                        axis=0
-                    ).tolist()
-                    if self.num_classes and self.predictions[slide] != []:
-                        logit = meth_fn[method](
-                            self.predictions[slide],
-                            axis=0
-                        ).tolist()
-                        csvwriter.writerow([slide] + logit + act)
+            if level == 'tile':
+                for slide in track(slides, update_period=0.5):
+                    # Write all tiles for a slide at once with pandas'
+                    # vectorized CSV writer.
+                    if self.num_classes and len(self.predictions[slide]):
+                        tile_data = np.concatenate(
+                            (self.predictions[slide], self.activations[slide]),
+                            axis=1
+                        )
                     else:
-                        csvwriter.writerow([slide] + act)
+                        tile_data = self.activations[slide]
+                    tile_df = pd.DataFrame(tile_data)
+                    tile_df.insert(0, 'Slide', slide)
+                    tile_df.to_csv(outfile, header=False, index=False)
+            else:
+                rows = []
+                for slide in track(slides, update_period=0.5):
+                    row = meth_fn[method](self.activations[slide], axis=0)
+                    if self.num_classes and len(self.predictions[slide]):
+                        logit = meth_fn[method](self.predictions[slide], axis=0)
+                        row = np.concatenate((logit, row))
+                    rows.append(row)
+                if rows and all(len(r) == len(rows[0]) for r in rows):
+                    # Write all slides at once.
+                    slide_df = pd.DataFrame(np.vstack(rows))
+                    slide_df.insert(0, 'Slide', list(slides))
+                    slide_df.to_csv(outfile, header=False, index=False)
+                else:
+                    for slide, row in zip(slides, rows):
+                        csvwriter.writerow([slide] + row.tolist())
         log.debug(f'Activations saved to [green]{filename}')
 
     def to_torch(
         self,
         outdir: str,
         slides: Optional[List[str]] = None,
-        verbose: bool = True
+        verbose: bool = True,
+        dtype: str = 'float32'
     ) -> None:
         """Export activations in torch format to .pt files in the directory.
 
-        Used for training MIL models.
+        Used for training MIL models. Activations are saved as contiguous
+        tensors, without copying if they already have the requested dtype,
+        and can be memory-mapped when loaded with
+        ``torch.load(..., mmap=True)`` (PyTorch >= 2.1).
 
         Args:
             outdir (str): Path to directory in which to save .pt files.
+            slides (list(str)): Slides to export. If None, exports all slides.
+                Defaults to None.
             verbose (bool): Verbose logging output. Defaults to True.
+            dtype (str): Data type of saved activations, either 'float32'
+                or 'float16'. Saving as float16 halves the size of bags;
+                MIL datasets convert bags back to float32 when loaded.
+                Defaults to 'float32'.
 
         """
         import torch
 
+        if dtype not in ('float32', 'float16'):
+            raise ValueError(
+                f"Unrecognized dtype '{dtype}'; expected 'float32' or 'float16'"
+            )
+        np_dtype = np.dtype(dtype)
         if not exists(outdir):
             os.makedirs(outdir)
         slides = self.slides if not slides else slides
-        for slide in (slides if not verbose else track(slides)):
+
+        def _save_slide(slide):
             if not len(self.activations[slide]):
                 log.info(f'Skipping empty slide [green]{slide}')
-                continue
+                return
+            # Contiguous tensors can be memory-mapped when loaded.
             slide_activations = torch.from_numpy(
-                self.activations[slide].astype(np.float32)
+                np.ascontiguousarray(self.activations[slide], dtype=np_dtype)
             )
             torch.save(slide_activations, join(outdir, f'{slide}.pt'))
             tfrecord2idx.save_index(
@@ -752,6 +870,16 @@ class DatasetFeatures:
                 join(outdir, f'{slide}.index')
             )
 
+        # Serialization and disk writes release the GIL,
+        # so slides are saved concurrently with a thread pool.
+        with ThreadPoolExecutor(sf.util.num_cpu(default=8)) as executor:
+            futures = [executor.submit(_save_slide, s) for s in slides]
+            completed = as_completed(futures)
+            if verbose:
+                completed = track(completed, total=len(futures), update_period=0.5)
+            for future in completed:
+                future.result()
+
         # Log the feature extraction configuration
         config = self.dump_config()
         if exists(join(outdir, 'bags_config.json')):
@@ -776,66 +904,79 @@ class DatasetFeatures:
 
         Returns:
             pd.core.frame.DataFrame: Dataframe with columns 'activations',
-            'predictions', 'uncertainty', and 'locations'.
+            'predictions', 'uncertainty', 'locations', 'tfr_index', and
+            'slide'. The 'slide' column and the index are categorical.
         """
 
-        index = [s for s in self.slides
-                   for _ in range(len(self.locations[s]))]
+        counts = np.fromiter(
+            (len(self.locations[s]) for s in self.slides),
+            dtype=np.int64,
+            count=len(self.slides)
+        )
+        codes = np.repeat(np.arange(len(self.slides)), counts)
+        if len(set(self.slides)) == len(self.slides):
+            index = pd.Categorical.from_codes(codes, categories=self.slides)
+        else:
+            index = pd.Categorical(np.asarray(self.slides, dtype=object)[codes])
+
+        def _rows(data):
+            # Stack per-slide arrays once, then split into row views.
+            arrays = [np.asarray(data[s]) for s in self.slides]
+            if not arrays:
+                return []
+            return list(np.concatenate(arrays, axis=0))
+
+        # Columns share a default RangeIndex, so no index alignment is
+        # needed when assembled; the slide index is set once at the end.
         df_dict = dict()
-        df_dict.update({
-            'locations': pd.Series([
-                self.locations[s][i]
-                for s in self.slides
-                for i in range(len(self.locations[s]))], index=index)
-        })
-        df_dict.update({
-            'tfr_index': pd.Series([
-                i
-                for s in self.slides
-                for i in range(len(self.locations[s]))], index=index)
-        })
+        df_dict['locations'] = pd.Series(_rows(self.locations), dtype=object)
+        df_dict['tfr_index'] = (
+            np.concatenate([np.arange(c, dtype=np.int64) for c in counts])
+            if len(counts) else np.array([], dtype=np.int64)
+        )
         if self.activations:
-            df_dict.update({
-                'activations': pd.Series([
-                    self.activations[s][i]
-                    for s in self.slides
-                    for i in range(len(self.activations[s]))], index=index)
-            })
+            df_dict['activations'] = pd.Series(
+                _rows(self.activations), dtype=object
+            )
         if self.predictions:
-            df_dict.update({
-                'predictions': pd.Series([
-                    self.predictions[s][i]
-                    for s in self.slides
-                    for i in range(len(self.predictions[s]))], index=index)
-            })
+            df_dict['predictions'] = pd.Series(
+                _rows(self.predictions), dtype=object
+            )
         if self.uncertainty:
-            df_dict.update({
-                'uncertainty': pd.Series([
-                    self.uncertainty[s][i]
-                    for s in self.slides
-                    for i in range(len(self.uncertainty[s]))], index=index)
-            })
-        df = pd.DataFrame(df_dict)
-        df['slide'] = df.index
+            df_dict['uncertainty'] = pd.Series(
+                _rows(self.uncertainty), dtype=object
+            )
+        df = pd.DataFrame(df_dict, copy=False)
+        df.index = pd.CategoricalIndex(index)
+        df['slide'] = index
         return df
 
-    def load_cache(self, path: str):
+    def load_cache(self, path: str, mmap: bool = True):
         """Load cached activations from PKL.
 
         Args:
             path (str): Path to pkl cache.
+            mmap (bool): Memory-map array data from the cache file, rather
+                than reading it all into memory. Pages are copy-on-write,
+                so loaded arrays remain writable. Only applies to caches
+                written by this version of slideflow. Defaults to True.
         """
         log.info(f'Loading from cache [green]{path}...')
-        with open(path, 'rb') as pt_pkl_file:
-            loaded_pkl = pickle.load(pt_pkl_file)
+        loaded_pkl = _load_cache(path, mmap=mmap)
+        if len(loaded_pkl) > 4:
+            self.activations = _dequantize_activations(
+                loaded_pkl[0], loaded_pkl[4]
+            )
+        else:
             self.activations = loaded_pkl[0]
-            self.predictions = loaded_pkl[1]
-            self.uncertainty = loaded_pkl[2]
-            self.locations = loaded_pkl[3]
-            if self.activations:
-                self.num_features = self.activations[self.slides[0]].shape[-1]
-            if self.predictions:
-                self.num_classes = self.predictions[self.slides[0]].shape[-1]
+        self.predictions = loaded_pkl[1]
+        self.uncertainty = loaded_pkl[2]
+        self.locations = loaded_pkl[3]
+        self.reset_category_cache()
+        if self.activations:
+            self.num_features = self.activations[self.slides[0]].shape[-1]
+        if self.predictions:
+            self.num_classes = self.predictions[self.slides[0]].shape[-1]
 
     def stats(
         self,
@@ -884,17 +1025,16 @@ class DatasetFeatures:
         tile_stats = {}
         pt_stats = {}
         category_stats = []
-        activation_stats = {}
-        for slide in self.slides:
-            if method == 'mean':
-                # Mean of each feature across tiles
-                summarized = np.mean(self.activations[slide], axis=0)
-            elif method == 'threshold':
-                # For each feature, count number of tiles with value above
-                # threshold, divided by number of tiles
-                act_sum = np.sum((self.activations[slide] > threshold), axis=0)
-                summarized = act_sum / self.activations[slide].shape[-1]
-            activation_stats[slide] = summarized
+        # Summarize each feature across tiles, for all slides at once. If
+        # method is 'mean', this is the mean of each feature. If 'threshold',
+        # this is the fraction of tiles with a value above threshold.
+        stacked, order, offsets = self._stacked_activations()
+        summarized = _segment_means(
+            stacked,
+            offsets,
+            threshold=(threshold if method == 'threshold' else None)
+        )
+        activation_stats = dict(zip(order, summarized.astype(np.float32)))
         for c in self.used_categories:
             category_stats += [np.array([
                 activation_stats[slide]
@@ -902,33 +1042,28 @@ class DatasetFeatures:
                 if self.labels[slide] == c
             ])]
 
-        for f in range(self.num_features):
-            # Tile-level ANOVA
-            stats_vals = list(self.activations_by_category(f).values())
-            with warnings.catch_warnings():
-                if hasattr(stats, "F_onewayConstantInputWarning"):
-                    warnings.simplefilter(
-                        "ignore",
-                        category=stats.F_onewayConstantInputWarning)
-                elif hasattr(stats, "ConstantInputWarning"):
-                    warnings.simplefilter(
-                        "ignore",
-                        category=stats.ConstantInputWarning)
-                fvalue, pvalue = stats.f_oneway(*stats_vals)
-                if not isnan(fvalue) and not isnan(pvalue):
-                    tile_stats.update({f: {'f': fvalue,
-                                        'p': pvalue}})
-                else:
-                    tile_stats.update({f: {'f': -1,
-                                        'p': 1}})
-                # Patient-level ANOVA
-                fvalue, pvalue = stats.f_oneway(*[c[:, f] for c in category_stats])
-                if not isnan(fvalue) and not isnan(pvalue):
-                    pt_stats.update({f: {'f': fvalue,
-                                        'p': pvalue}})
+        # ANOVA across all features at once, at the tile and patient level.
+        with warnings.catch_warnings():
+            if hasattr(stats, "F_onewayConstantInputWarning"):
+                warnings.simplefilter(
+                    "ignore",
+                    category=stats.F_onewayConstantInputWarning)
+            elif hasattr(stats, "ConstantInputWarning"):
+                warnings.simplefilter(
+                    "ignore",
+                    category=stats.ConstantInputWarning)
+            tile_f, tile_p = _f_oneway(
+                *self._activations_by_category().values()
+            )
+            pt_f, pt_p = _f_oneway(*category_stats)
+        for _stats, fvals, pvals in ((tile_stats, tile_f, tile_p),
+                                     (pt_stats, pt_f, pt_p)):
+            valid = ~(np.isnan(fvals) | np.isnan(pvals))
+            for f in range(self.num_features):
+                if valid[f]:
+                    _stats[f] = {'f': fvals[f], 'p': pvals[f]}
                 else:
-                    pt_stats.update({f: {'f': -1,
-                                        'p': 1}})
+                    _stats[f] = {'f': -1, 'p': 1}
         try:
             pt_sorted_ft = sorted(
                 range(self.num_features),
@@ -1026,10 +1161,8 @@ class DatasetFeatures:
                 self.predictions[slide][:, prediction_filter],
                 axis=1
             )
-            slide_perc = np.array([
-                np.count_nonzero(tile_pred == logit) / len(tile_pred)
-                for logit in range(self.num_classes)
-            ])
+            counts = np.bincount(tile_pred, minlength=self.num_classes)
+            slide_perc = counts / len(tile_pred)
             slide_percentages.update({slide: slide_perc})
         return slide_percentages
 
@@ -1065,11 +1198,8 @@ class DatasetFeatures:
                 self.predictions[slide][:, prediction_filter],
                 axis=1
             )
-            slide_perc = np.array([
-                np.count_nonzero(tile_pred == logit) / len(tile_pred)
-                for logit in range(self.num_classes)
-            ])
-            slide_predictions.update({slide: int(np.argmax(slide_perc))})
+            counts = np.bincount(tile_pred, minlength=self.num_classes)
+            slide_predictions.update({slide: int(np.argmax(counts))})
         return slide_predictions
 
     def map_activations(self, **kwargs) -> "sf.SlideMap":
@@ -1106,16 +1236,18 @@ class DatasetFeatures:
             sf.SlideMap
 
         """
-        all_x, all_y, all_slides, all_tfr_idx = [], [], [], []
+        # Predictions are stored as arrays; convert any DataFrames once.
         for slide in self.slides:
-            all_x.append(self.predictions[slide].values[:, x])
-            all_y.append(self.predictions[slide].values[:, y])
-            all_slides.append([slide for _ in range(self.predictions[slide].shape[0])])
-            all_tfr_idx.append(np.arange(self.predictions[slide].shape[0]))
-        all_x = np.concatenate(all_x)
-        all_y = np.concatenate(all_y)
-        all_slides = np.concatenate(all_slides)
-        all_tfr_idx = np.concatenate(all_tfr_idx)
+            if isinstance(self.predictions[slide], pd.DataFrame):
+                self.predictions[slide] = self.predictions[slide].values
+        preds = [self.predictions[slide] for slide in self.slides]
+        counts = np.fromiter(
+            (p.shape[0] for p in preds), dtype=np.int64, count=len(preds)
+        )
+        all_x = np.concatenate([p[:, x] for p in preds])
+        all_y = np.concatenate([p[:, y] for p in preds])
+        all_slides = np.repeat(np.asarray(self.slides), counts)
+        all_tfr_idx = np.concatenate([np.arange(c) for c in counts])
 
         return sf.SlideMap.from_xy(
             x=all_x,
@@ -1141,7 +1273,9 @@ class DatasetFeatures:
         self.uncertainty.update(df.uncertainty)
         self.locations.update(df.locations)
         self.tfrecords = np.concatenate([self.tfrecords, df.tfrecords])
+        self._tfr_by_slide.update(df._tfr_by_slide)
         self.slides = list(self.activations.keys())
+        self.reset_category_cache()
 
     def remove_slide(self, slide: str) -> None:
         """Removes slide from calculated features."""
@@ -1153,12 +1287,13 @@ class DatasetFeatures:
             del self.uncertainty[slide]
         if slide in self.locations:
             del self.locations[slide]
-        self.tfrecords = np.array([
-            t for t in self.tfrecords
-            if sf.util.path_to_name(t) != slide
-        ])
+        tfr = self._tfr_by_slide.pop(slide, None)
+        if tfr is not None:
+            tfrecords = np.asarray(self.tfrecords)
+            self.tfrecords = tfrecords[tfrecords != tfr]
         if slide in self.slides:
             self.slides.remove(slide)
+        self.reset_category_cache()
 
     def save_example_tiles(
         self,
@@ -1188,37 +1323,44 @@ class DatasetFeatures:
 
         if not slides:
             slides = self.slides
-        for f in features:
+        slide2tfr = self._tfr_by_slide
+
+        # Slide name and tile index for each row of the stacked activations.
+        counts = [len(self.activations[slide]) for slide in slides]
+        slide_of_tile = np.repeat(np.arange(len(slides)), counts)
+        index_of_tile = np.concatenate(
+            [np.arange(c, dtype=np.int64) for c in counts]
+        )
+        # Gather the requested feature columns for all tiles in one pass.
+        feature_values = np.concatenate(
+            [self.activations[slide][:, features] for slide in slides]
+        )
+
+        for fi, f in enumerate(features):
             if not exists(join(outdir, str(f))):
                 os.makedirs(join(outdir, str(f)))
 
-            gradient_list = []
-            for slide in slides:
-                for i, val in enumerate(self.activations[slide][:, f]):
-                    gradient_list += [{
-                                    'val': val,
-                                    'slide': slide,
-                                    'index': i
-                    }]
-            gradient = np.array(sorted(gradient_list, key=lambda k: k['val']))
-            sample_idx = np.linspace(
+            values = feature_values[:, fi]
+            order = np.argsort(values, kind='stable')
+            sample_idx = order[np.linspace(
                 0,
-                gradient.shape[0]-1,
+                len(order)-1,
                 num=tiles_per_feature,
                 dtype=int
-            )
-            for i, g in track(enumerate(gradient[sample_idx]),
+            )]
+            for i, t in track(enumerate(sample_idx),
                              total=tiles_per_feature,
                              description=f"Feature {f}"):
-                for tfr in self.tfrecords:
-                    if sf.util.path_to_name(tfr) == g['slide']:
-                        tfr_dir = tfr
+                g_slide = slides[slide_of_tile[t]]
+                g_index = int(index_of_tile[t])
+                tfr_dir = slide2tfr.get(g_slide)
                 if not tfr_dir:
                     log.warning("TFRecord location not found for "
-                                f"slide {g['slide']}")
-                slide, image = sf.io.get_tfrecord_by_index(tfr_dir, g['index'])
-                tile_filename = (f"{i}-tfrecord{g['slide']}-{g['index']}"
-                                 + f"-{g['val']:.2f}.jpg")
+                                f"slide {g_slide}")
+                    continue
+                slide, image = sf.io.get_tfrecord_by_index(tfr_dir, g_index)
+                tile_filename = (f"{i}-tfrecord{g_slide}-{g_index}"
+                                 + f"-{values[t]:.2f}.jpg")
                 image_string = open(join(outdir, str(f), tile_filename), 'wb')
                 image_string.write(image.numpy())
                 image_string.close()
@@ -1263,6 +1405,9 @@ class _FeatureGenerator:
         device: Optional[str] = None,
         num_workers: Optional[int] = None,
         augment: Optional[Union[bool, str]] = None,
+        compile: bool = False,
+        cuda_graph: bool = False,
+        allow_tf32: bool = False,
         **kwargs
     ) -> None:
         """Initializes FeatureGenerator.
@@ -1274,12 +1419,28 @@ class _FeatureGenerator:
             dataset (sf.Dataset): Dataset to use for feature extraction.
 
         Keyword Args:
+            allow_tf32 (bool): Allow PyTorch to use Tensorfloat-32 for
+                matmul and convolutions, and enable cuDNN autotuning
+                (``torch.backends.cudnn.benchmark``). Results are no longer
+                bit-exact with float32. Only used for PyTorch feature
+                extractors. Defaults to False.
             augment (bool, str, optional): Whether to use data augmentation
                 during feature extraction. If True, will use default
                 augmentation. If str, will use augmentation specified by the
                 string. Defaults to None.
             batch_size (int, optional): Batch size to use for feature
                 extraction. Defaults to 32.
+            compile (bool): Compile stain normalization and feature
+                extraction with ``torch.compile`` (PyTorch >= 2.0). Only used
+                for PyTorch feature extractors. Falls back to eager execution
+                if compilation fails. Defaults to False.
+            cuda_graph (bool): Capture stain normalization and feature
+                extraction (compiled, if ``compile=True``) into a CUDA graph,
+                replayed for each full batch. Outputs are cloned from the
+                graph's static buffers, so they remain valid while later
+                batches run. Only used for PyTorch feature extractors on
+                CUDA devices. Falls back to eager execution if capture fails.
+                Defaults to False.
             device (str, optional): Device to use for feature extraction.
                 Only used for PyTorch feature extractors. Defaults to None.
             include_preds (bool, optional): Whether to include model
@@ -1308,6 +1469,7 @@ class _FeatureGenerator:
 
         """
         self.model = model
+        self._model_type_cache = None  # type: Optional[Tuple]
         self.dataset = dataset
         self.layers = sf.util.as_list(layers)
         self.batch_size = batch_size
@@ -1354,20 +1516,74 @@ class _FeatureGenerator:
             log.debug("Moving normalizer to device: {}".format(self.device))
             self.normalizer.device = self.device
 
+        # Copy batches to the GPU on a separate stream, so that the copy of
+        # the next batch overlaps with computation on the current batch.
+        self._copy_stream = None
+        if self.is_torch() and str(self.device).startswith('cuda'):
+            import torch
+            self._copy_stream = torch.cuda.Stream(device=self.device)
+
+        # Allows PyTorch to internally use tf32 for matmul and convolutions,
+        # and to autotune convolutions for the fixed tile shape.
+        if allow_tf32 and self.is_torch():
+            import torch
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True  # type: ignore
+            torch.backends.cudnn.benchmark = True  # type: ignore
+            if hasattr(torch, 'set_float32_matmul_precision'):
+                torch.set_float32_matmul_precision('high')
+
+        # Optionally compile normalization + feature extraction,
+        # and/or replay it from a captured CUDA graph. Outputs are handed to
+        # a post-processing thread while later batches run, so the default
+        # compile mode is used rather than 'reduce-overhead', whose CUDA
+        # graphs reuse output buffers between calls. CUDAGraphModule
+        # clones its outputs.
+        self._fast_forward = None  # type: Optional[Callable]
+        if compile and self.is_torch():
+            import torch
+            if hasattr(torch, 'compile'):
+                self._fast_forward = torch.compile(
+                    self._normalize_and_generate,
+                    dynamic=False
+                )
+            else:
+                log.warning(
+                    "torch.compile requires PyTorch >= 2.0; feature "
+                    "extraction will not be compiled."
+                )
+        if cuda_graph and self.is_torch():
+            from slideflow.model import torch_utils
+            self._fast_forward = torch_utils.CUDAGraphModule(
+                self._fast_forward or self._normalize_and_generate
+            )
+
     def _calculate_feature_batch(self, batch_img):
         """Calculate features from a batch of images."""
 
-        # If a PyTorch generator, wrap in no_grad() and perform on CUDA
+        # If a PyTorch generator, wrap in inference_mode() and perform on CUDA
         if self.is_torch():
             import torch
-            with torch.no_grad():
-                batch_img = batch_img.to(self.device)
-                if self.has_torch_gpu_normalizer():
-                    batch_img = self.normalizer.preprocess(
-                        batch_img.to(self.normalizer.device),
-                        standardize=self.standardize
-                    ).to(self.device)
-                return self.generator(batch_img)
+            with torch.inference_mode():
+                if self._copy_stream is not None:
+                    compute_stream = torch.cuda.current_stream(self.device)
+                    with torch.cuda.stream(self._copy_stream):
+                        batch_img = batch_img.to(self.device, non_blocking=True)
+                    compute_stream.wait_stream(self._copy_stream)
+                    batch_img.record_stream(compute_stream)
+                else:
+                    batch_img = batch_img.to(self.device, non_blocking=True)
+                if self._fast_forward is not None:
+                    try:
+                        return self._fast_forward(batch_img)
+                    except Exception as e:
+                        log.warning(
+                            "Unable to use compiled/graphed feature "
+                            f"extraction ({e}); falling back to eager "
+                            "execution."
+                        )
+                        self._fast_forward = None
+                return self._normalize_and_generate(batch_img)
         else:
             if self.has_torch_gpu_normalizer():
                 import torch
@@ -1383,6 +1599,33 @@ class _FeatureGenerator:
                     batch_img = tf.image.per_image_standardization(batch_img)
             return self.generator(batch_img)
 
+    def _normalize_and_generate(self, batch_img):
+        """Stain normalize (if using a PyTorch GPU normalizer) and calculate
+        features for a batch of images already on device."""
+        if self.has_torch_gpu_normalizer():
+            batch_img = self.normalizer.preprocess(
+                batch_img.to(self.normalizer.device),
+                standardize=self.standardize
+            ).to(self.device)
+        return self._fuse_torch_features(self.generator(batch_img))
+
+    def _fuse_torch_features(self, model_out):
+        """Concatenate features from multiple layers on-device, so that
+        only a single feature tensor is transferred to the host."""
+        import torch
+
+        if not isinstance(model_out, list):
+            return model_out
+        n_feat = (len(model_out)
+                  - int(bool(self.uq and self.include_uncertainty))
+                  - int(bool(self.include_preds)))
+        features = model_out[:n_feat]
+        if (n_feat > 1
+           and all(isinstance(f, torch.Tensor) for f in features)
+           and len(set(f.shape[0] for f in features)) == 1):
+            return [torch.cat(features, dim=1)] + model_out[n_feat:]
+        return model_out
+
     def _process_out(self, model_out, batch_slides, batch_loc):
         model_out = sf.util.as_list(model_out)
 
@@ -1408,14 +1651,18 @@ class _FeatureGenerator:
         elif self.is_torch():
             slides = batch_slides
             try:
-                model_out = [
-                m.cpu().numpy() if not isinstance(m, list) else m
-                for m in model_out
-            ]
+                model_out = _torch_outputs_to_numpy(model_out)
             except:
                 model_out = [m for m in model_out]
             if batch_loc[0] is not None:
-                loc = np.stack([batch_loc[0], batch_loc[1]], axis=1)
+                import torch
+                if isinstance(batch_loc[0], torch.Tensor):
+                    # Stack locations as a tensor, converting to numpy once.
+                    loc = torch.stack(
+                        [batch_loc[0], batch_loc[1]], dim=1
+                    ).cpu().numpy()
+                else:
+                    loc = np.stack([batch_loc[0], batch_loc[1]], axis=1)
             else:
                 loc = None
 
@@ -1435,7 +1682,10 @@ class _FeatureGenerator:
 
         # Concatenate features if we have features from >1 layer
         if isinstance(features, list):
-            features = np.concatenate(features, axis=1)
+            if len(features) == 1:
+                features = features[0]
+            else:
+                features = np.concatenate(features, axis=1)
 
         return features, predictions, uncertainty, slides, loc
 
@@ -1609,20 +1859,40 @@ class _FeatureGenerator:
     def is_model_path(self):
         return isinstance(self.model, str) and (self.is_tf() or self.is_torch())
 
+    def _model_type(self, key: str, fn: Callable) -> bool:
+        """Return a cached check of the model type.
+
+        Checks are cached until ``self.model`` is reassigned.
+        """
+        if (self._model_type_cache is None
+           or self._model_type_cache[0] is not self.model):
+            self._model_type_cache = (self.model, dict())
+        checks = self._model_type_cache[1]
+        if key not in checks:
+            checks[key] = fn()
+        return checks[key]
+
     def is_extractor(self):
-        return isinstance(self.model, BaseFeatureExtractor)
+        return self._model_type(
+            'extractor',
+            lambda: isinstance(self.model, BaseFeatureExtractor)
+        )
 
     def is_torch(self):
         if self.is_extractor():
-            return self.model.is_torch()
+            return self._model_type('torch', self.model.is_torch)
         else:
-            return sf.model.is_torch_model(self.model)
+            return self._model_type(
+                'torch', lambda: sf.model.is_torch_model(self.model)
+            )
 
     def is_tf(self):
         if self.is_extractor():
-            return self.model.is_tensorflow()
+            return self._model_type('tf', self.model.is_tensorflow)
         else:
-            return sf.model.is_tensorflow_model(self.model)
+            return self._model_type(
+                'tf', lambda: sf.model.is_tensorflow_model(self.model)
+            )
 
     def has_torch_gpu_normalizer(self):
         return (
@@ -1661,12 +1931,18 @@ class _FeatureGenerator:
                 n_workers = self.num_workers
             log.debug(
                 "Setting up PyTorch dataset iterator (num_workers="
-                f"{n_workers}, chunk_size=8)"
+                f"{n_workers}, chunk_size=8, prefetch_factor=4)"
             )
+            # Pin batches in page-locked memory when extracting on a GPU,
+            # so host-to-device copies can be performed asynchronously.
+            # Keep more batches in flight per worker, so decoding stays
+            # ahead of the GPU.
             return self.dataset.torch(
                 None,
                 num_workers=n_workers,
                 chunk_size=8,
+                pin_memory=str(self.device).startswith('cuda'),
+                prefetch_factor=4,
                 **self.dts_kw  # type: ignore
             )
 
@@ -1694,10 +1970,16 @@ class _FeatureGenerator:
         # Interleave tfrecord datasets
         estimated_tiles = self.dataset.num_tiles
 
-        activations = defaultdict(list)  # type: Dict[str, Any]
-        predictions = defaultdict(list)  # type: Dict[str, Any]
-        uncertainty = defaultdict(list)  # type: Dict[str, Any]
-        locations = defaultdict(list)  # type: Dict[str, Any]
+        # Preallocate per-slide buffers using tile counts from the manifest.
+        manifest = self.dataset.manifest()
+        tiles_per_slide = {
+            sf.util.path_to_name(tfr): m.get('clipped', m['total'])
+            for tfr, m in manifest.items()
+        }
+        activations = _SlideBuffers(tiles_per_slide)
+        predictions = _SlideBuffers(tiles_per_slide)
+        uncertainty = _SlideBuffers(tiles_per_slide)
+        locations = _SlideBuffers(tiles_per_slide)
 
         # Worker to process activations/predictions, for more efficient throughput
         q = queue.Queue()  # type: queue.Queue
@@ -1711,15 +1993,24 @@ class _FeatureGenerator:
                     model_out, batch_slides, batch_loc
                 )
 
-                for d, slide in enumerate(slides):
+                unique_slides, slide_idx = np.unique(
+                    np.asarray(slides), return_inverse=True
+                )
+                for u, slide in enumerate(unique_slides.tolist()):
+                    if len(unique_slides) == 1:
+                        # Whole batch is from one slide; write it without
+                        # an intermediate fancy-indexed copy.
+                        rows = slice(None)
+                    else:
+                        rows = np.flatnonzero(slide_idx == u)
                     if self.layers:
-                        activations[slide].append(features[d])
+                        activations.append(slide, features[rows])
                     if self.include_preds and preds is not None:
-                        predictions[slide].append(preds[d])
+                        predictions.append(slide, preds[rows])
                     if self.uq and self.include_uncertainty:
-                        uncertainty[slide].append(unc[d])
+                        uncertainty.append(slide, unc[rows])
                     if loc is not None:
-                        locations[slide].append(loc[d])
+                        locations.append(slide, loc[rows])
 
         batch_proc_thread = threading.Thread(target=batch_worker, daemon=True)
         batch_proc_thread.start()
@@ -1735,22 +2026,334 @@ class _FeatureGenerator:
             progress = False
         else:
             pb = None
+        # Coalesce progress bar updates, as each call to pb.advance()
+        # acquires a lock and may trigger a re-render.
+        pb_every = 16 * self.batch_size
+        pb_pending = 0
         with sf.util.cleanup_progress((pb if progress else None)):
             for batch_img, _, batch_slides, batch_loc_x, batch_loc_y in dataset:
                 model_output = self._calculate_feature_batch(batch_img)
                 q.put((model_output, batch_slides, (batch_loc_x, batch_loc_y)))
                 if pb:
-                    pb.advance(task, self.batch_size)
+                    pb_pending += self.batch_size
+                    if pb_pending >= pb_every:
+                        pb.advance(task, pb_pending)
+                        pb_pending = 0
+            if pb and pb_pending:
+                pb.advance(task, pb_pending)
         q.put((None, None, None))
         batch_proc_thread.join()
         if hasattr(dataset, 'close'):
             dataset.close()
 
-        return activations, predictions, locations, uncertainty
+        return (
+            activations.to_dict(),
+            predictions.to_dict(),
+            locations.to_dict(),
+            uncertainty.to_dict()
+        )
+
+
+class _SlideBuffers:
+    """Accumulates per-slide rows into preallocated arrays.
+
+    Buffers are allocated on first write for each slide, sized from the
+    expected number of tiles, and grown if more rows are received.
+    """
+
+    def __init__(self, expected_rows: Dict[str, int]) -> None:
+        self.expected_rows = expected_rows
+        self.buffers = dict()  # type: Dict[str, np.ndarray]
+        self.counts = dict()  # type: Dict[str, int]
+
+    def append(self, slide: str, rows: np.ndarray) -> None:
+        rows = np.asarray(rows)
+        n = self.counts.get(slide, 0)
+        end = n + rows.shape[0]
+        buf = self.buffers.get(slide)
+        if buf is None:
+            size = max(self.expected_rows.get(slide, 0), end)
+            buf = np.empty((size,) + rows.shape[1:], dtype=rows.dtype)
+            self.buffers[slide] = buf
+        elif end > buf.shape[0]:
+            grown = np.empty((max(end, 2 * buf.shape[0]),) + buf.shape[1:],
+                             dtype=buf.dtype)
+            grown[:n] = buf[:n]
+            buf = self.buffers[slide] = grown
+        buf[n:end] = rows
+        self.counts[slide] = end
+
+    def to_dict(self) -> Dict[str, np.ndarray]:
+        """Return a dict mapping slides to arrays of received rows."""
+        return {
+            s: (buf if self.counts[s] == buf.shape[0] else buf[:self.counts[s]])
+            for s, buf in self.buffers.items()
+        }
+
+
+# -----------------------------------------------------------------------------
+
+def _location_keys(locations: Any) -> np.ndarray:
+    """Pack (x, y) locations into single int64 keys."""
+    locations = np.asarray(locations, dtype=np.int64).reshape(-1, 2)
+    return (locations[:, 0] << 32) | (locations[:, 1] & 0xFFFFFFFF)
 
 
+def _match_locations(locations: Any, reference: Any) -> np.ndarray:
+    """Find the index of each location in a reference list of locations.
+
+    Args:
+        locations (np.ndarray): Array of (x, y) locations, shape (N, 2).
+        reference (list(tuple(int, int))): Reference locations.
+
+    Returns:
+        np.ndarray: int64 array of length N with the position of each
+        location in ``reference``.
+
+    Raises:
+        KeyError: If a location is not found in the reference.
+    """
+    keys = _location_keys(locations)
+    ref_keys = _location_keys(reference)
+    order = np.argsort(ref_keys, kind='stable')
+    sorted_ref = ref_keys[order]
+    pos = np.searchsorted(sorted_ref, keys)
+    pos_clipped = np.minimum(pos, len(sorted_ref) - 1)
+    if len(sorted_ref) == 0 or not np.array_equal(sorted_ref[pos_clipped], keys):
+        raise KeyError("Location not found in reference locations.")
+    return order[pos_clipped]
+
+
+def _segment_means(
+    values: np.ndarray,
+    offsets: np.ndarray,
+    threshold: Optional[float] = None
+) -> np.ndarray:
+    """Calculate the mean of each column within row segments.
+
+    Segment ``i`` spans rows ``offsets[i]`` to ``offsets[i+1]``. If
+    ``threshold`` is given, calculates the fraction of rows above threshold
+    instead. Empty segments are NaN. Segments are reduced in chunks on a
+    thread pool, as NumPy releases the GIL during reductions.
+    """
+    n_seg = len(offsets) - 1
+    counts = np.diff(offsets)
+    out = np.full((n_seg, values.shape[-1]), np.nan)
+
+    def _reduce(seg):
+        lo, hi = offsets[seg[0]], offsets[seg[-1]+1]
+        block = values[lo:hi]
+        if threshold is not None:
+            # Boolean mask viewed as int8, to avoid an int64 intermediate.
+            block = (block > threshold).view(np.int8)
+        nonempty = counts[seg] > 0
+        if nonempty.any():
+            sums = np.add.reduceat(
+                block, offsets[seg][nonempty] - lo, axis=0, dtype=np.float64
+            )
+            out[seg[nonempty]] = sums / counts[seg][nonempty, None]
+
+    n_chunks = min(sf.util.num_cpu(default=8), n_seg)
+    if n_chunks:
+        chunks = np.array_split(np.arange(n_seg), n_chunks)
+        with ThreadPoolExecutor(n_chunks) as pool:
+            list(pool.map(_reduce, chunks))
+    return out
+
+
+def _f_oneway(*groups: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """One-way ANOVA for each column of the given 2D groups.
+
+    Uses ``scipy.stats.f_oneway(..., axis=0)`` when available, falling back
+    to an equivalent vectorized NumPy implementation for older versions
+    of SciPy which do not support the ``axis`` argument.
+    """
+    try:
+        return stats.f_oneway(*groups, axis=0)
+    except TypeError:
+        pass
+    from scipy.special import fdtrc
+
+    groups = tuple(np.asarray(g, dtype=np.float64) for g in groups)
+    n = np.array([len(g) for g in groups])
+    dfb, dfw = len(groups) - 1, n.sum() - len(groups)
+    means = [g.mean(axis=0) for g in groups]
+    grand_mean = sum(g.sum(axis=0) for g in groups) / n.sum()
+    ss_between = sum(ni * (m - grand_mean) ** 2 for ni, m in zip(n, means))
+    ss_within = sum(((g - m) ** 2).sum(axis=0) for g, m in zip(groups, means))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        f = (ss_between / dfb) / (ss_within / dfw)
+    return f, fdtrc(dfb, dfw, f)
+
+
+def _torch_outputs_to_numpy(outputs: List[Any]) -> List[Any]:
+    """Convert a list of PyTorch model outputs to numpy arrays.
+
+    CUDA tensors are copied asynchronously into pinned host memory, with a
+    single synchronization after all copies have been queued, rather than
+    blocking once per output.
+    """
+    import torch
+
+    host = []
+    streams = []
+    for m in outputs:
+        if isinstance(m, torch.Tensor) and m.is_cuda:
+            buf = torch.empty(m.shape, dtype=m.dtype, pin_memory=True)
+            buf.copy_(m, non_blocking=True)
+            host.append(buf)
+            stream = torch.cuda.current_stream(m.device)
+            if stream not in streams:
+                streams.append(stream)
+        else:
+            host.append(m)
+    for stream in streams:
+        stream.synchronize()
+    return [
+        m.cpu().numpy() if isinstance(m, torch.Tensor) else m
+        for m in host
+    ]
+
+
+_CACHE_FORMAT = 'slideflow-features-cache'
+_CACHE_ALIGN = 64
+
+
+def _dump_cache(obj: Any, path: str) -> None:
+    """Pickle an object to a cache file, with array data stored out-of-band.
+
+    The object is pickled with protocol 5, and the raw buffers of NumPy
+    arrays are written directly to the file (aligned to 64 bytes) rather
+    than being copied into the pickle stream. A small pickled header
+    describing the layout precedes the data.
+    """
+    buffers = []  # type: List[pickle.PickleBuffer]
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raw_buffers = [b.raw() for b in buffers]
+    header = {
+        'format': _CACHE_FORMAT,
+        'version': 1,
+        'data_size': len(data),
+        'buffer_sizes': [r.nbytes for r in raw_buffers],
+    }
+    with open(path, 'wb') as f:
+        pickle.dump(header, f)
+        f.write(data)
+        for raw in raw_buffers:
+            f.write(b'\0' * (-f.tell() % _CACHE_ALIGN))
+            f.write(raw)
+
+
+def _load_cache(path: str, mmap: bool = False) -> Any:
+    """Load an object from a cache file written by :func:`_dump_cache`.
+
+    If ``mmap`` is True, out-of-band buffers are memory-mapped
+    (copy-on-write) rather than read into memory, so array data is only
+    read from disk as it is accessed.
+
+    Cache files written by older versions (a single in-band pickle)
+    are also supported.
+    """
+    with open(path, 'rb') as f:
+        header = pickle.load(f)
+        if not (isinstance(header, dict)
+                and header.get('format') == _CACHE_FORMAT):
+            # Legacy cache: the first pickled object is the payload.
+            return header
+        data = f.read(header['data_size'])
+        buffers = []
+        if mmap and sum(header['buffer_sizes']):
+            import mmap as _mmap
+            mm = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_COPY)
+            view = memoryview(mm)
+            offset = f.tell()
+            for size in header['buffer_sizes']:
+                offset += -offset % _CACHE_ALIGN
+                buffers.append(view[offset:offset+size])
+                offset += size
+        else:
+            for size in header['buffer_sizes']:
+                f.seek(-f.tell() % _CACHE_ALIGN, os.SEEK_CUR)
+                buf = bytearray(size)
+                f.readinto(buf)
+                buffers.append(buf)
+    return pickle.loads(data, buffers=buffers)
+
+
+def _quantize_activations(
+    activations: Dict[str, np.ndarray],
+    dtype: str
+) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """Convert activations to a reduced-precision dtype for caching.
+
+    Returns the converted activations and a dictionary of quantization
+    parameters, for use with :func:`_dequantize_activations`.
+    """
+    if dtype == 'float16':
+        return (
+            {s: a.astype(np.float16) for s, a in activations.items()},
+            {'dtype': 'float16'}
+        )
+    elif dtype == 'int8':
+        quantized, params = {}, {}
+        for s, a in activations.items():
+            a = np.asarray(a, dtype=np.float32)
+            if not a.size:
+                lo = np.zeros(a.shape[-1], dtype=np.float32)
+                scale = np.ones(a.shape[-1], dtype=np.float32)
+            else:
+                lo = a.min(axis=0)
+                scale = (a.max(axis=0) - lo) / 255
+                scale[scale == 0] = 1
+            q = np.rint((a - lo) / scale) - 128
+            quantized[s] = q.astype(np.int8)
+            params[s] = (lo, scale.astype(np.float32))
+        return quantized, {'dtype': 'int8', 'params': params}
+    else:
+        raise ValueError(
+            f"Unrecognized cache dtype '{dtype}'; expected 'float16' or 'int8'"
+        )
+
+
+def _dequantize_activations(
+    activations: Dict[str, np.ndarray],
+    quant: Dict[str, Any]
+) -> Dict[str, np.ndarray]:
+    """Restore float32 activations from :func:`_quantize_activations`."""
+    if quant['dtype'] == 'float16':
+        return {s: a.astype(np.float32) for s, a in activations.items()}
+    restored = {}
+    for s, a in activations.items():
+        lo, scale = quant['params'][s]
+        restored[s] = (a.astype(np.float32) + 128) * scale + lo
+    return restored
+
 # -----------------------------------------------------------------------------
 
+def _compile_extractor(model: Any) -> Optional["torch.nn.Module"]:
+    """Compile the network of a PyTorch feature extractor in place.
+
+    Uses the default compile mode, as bag outputs are read after later
+    batches have run (CUDA graphs from 'reduce-overhead' reuse output
+    buffers). Returns the original network, to be restored by the caller
+    once finished, or None if the network was not compiled.
+    """
+    if getattr(model, 'backend', None) != 'torch':
+        return None
+    import torch
+    if not hasattr(torch, 'compile'):
+        log.warning(
+            "torch.compile requires PyTorch >= 2.0; feature "
+            "extraction will not be compiled."
+        )
+        return None
+    original = getattr(model, 'model', None)
+    if not isinstance(original, torch.nn.Module):
+        return None
+    model.model = torch.compile(original, dynamic=False)
+    return original
+
+
 def _export_bags(
     model: Union[Callable, Dict],
     dataset: "sf.Dataset",
@@ -1759,18 +2362,43 @@ def _export_bags(
     pb: Any,
     outdir: str,
     slide_task: int = 0,
+    dtype: str = 'float32',
     **dts_kwargs
 ) -> None:
     """Export bags for a given feature extractor."""
-    for slide_batch in sf.util.batch(slides, slide_batch_size):
+    # A new DatasetFeatures is created for each batch of slides, so compile
+    # the extractor's network once here rather than once per slide batch.
+    # The original network is restored when finished.
+    original_network = None
+    if dts_kwargs.get('compile'):
+        original_network = _compile_extractor(model)
+        if original_network is not None:
+            dts_kwargs['compile'] = False
+    try:
+        # Remove any existing slide filter once, rather than for every batch.
         try:
-            _dataset = dataset.remove_filter(filters='slide')
+            base_dataset = dataset.remove_filter(filters='slide')
         except errors.DatasetFilterError:
-            _dataset = dataset
-        _dataset = _dataset.filter(filters={'slide': slide_batch})
-        df = sf.DatasetFeatures(model, _dataset, pb=pb, **dts_kwargs)
-        df.to_torch(outdir, verbose=False)
-        pb.advance(slide_task, len(slide_batch))
+            base_dataset = dataset
+        # Bags are written in a background thread, so that writing one batch
+        # of slides overlaps with feature extraction for the next.
+        with ThreadPoolExecutor(1) as save_pool:
+            pending = None
+            for slide_batch in sf.util.batch(slides, slide_batch_size):
+                _dataset = base_dataset.filter(filters={'slide': slide_batch})
+                df = sf.DatasetFeatures(model, _dataset, pb=pb, **dts_kwargs)
+                if pending is not None:
+                    pending.result()
+                pending = save_pool.submit(
+                    df.to_torch, outdir, verbose=False, dtype=dtype
+                )
+                pb.advance(slide_task, len(slide_batch))
+            if pending is not None:
+                pending.result()
+    finally:
+        if original_network is not None:
+            model.model = original_network
+
 
 def _distributed_export(
     device: int,
@@ -1781,7 +2409,8 @@ def _distributed_export(
     pb: Any,
     outdir: str,
     slide_task: int = 0,
-    dts_kwargs: Any = None
+    dts_kwargs: Any = None,
+    dtype: str = 'float32'
 ) -> None:
     """Distributed export across multiple GPUs."""
     model = sf.model.extractors.build_extractor_from_cfg(model_cfg, device=f'cuda:{device}')
@@ -1793,5 +2422,6 @@ def _distributed_export(
         pb,
         outdir,
         slide_task,
+        dtype=dtype,
         **(dts_kwargs or {})
     )
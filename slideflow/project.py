@@ -2065,6 +2065,7 @@ class Project:
         batch_size: int = 32,
         slide_batch_size: int = 16,
         num_gpus: int = 0,
+        dtype: str = 'float32',
         **kwargs: Any
     ) -> str:
         """Generate tile-level features for slides for use with MIL models.
@@ -2105,6 +2106,9 @@ class Project:
             slide_batch_size (int): Interleave feature calculation across
                 this many slides. Higher values may improve performance
                 but require more memory. Defaults to 16.
+            dtype (str): Data type of exported features, either 'float32'
+                or 'float16'. 'float16' halves the size of exported bags.
+                Defaults to 'float32'.
             **kwargs: Additional keyword arguments are passed to
                 :class:`slideflow.DatasetFeatures`.
 
@@ -2186,10 +2190,10 @@ class Project:
             os.makedirs(outdir)
 
         # Detect already generated pt files
-        done = [
+        done = {
             path_to_name(f) for f in os.listdir(outdir)
             if sf.util.path_to_ext(join(outdir, f)) == 'pt'
-        ]
+        }
 
         if not force_regenerate and len(done):
             all_slides = dataset.slides()
@@ -2243,6 +2247,7 @@ class Project:
                     pb=pb,
                     outdir=outdir,
                     slide_task=slide_task,
+                    dtype=dtype,
                     **dts_kwargs
                 )
 
@@ -2268,7 +2273,8 @@ class Project:
                             mp_pb.tracker,
                             outdir,
                             slide_task,
-                            dts_kwargs
+                            dts_kwargs,
+                            dtype
                         ),
                         nprocs=num_gpus
                     )
@@ -1,3 +1,4 @@
+import functools
 import numpy as np
 import slideflow as sf
 from typing import Optional
@@ -20,6 +21,35 @@ if sf.util.torch_available:
 
 # -----------------------------------------------------------------------------
 
+def _compile_forward(model: "torch.nn.Module") -> None:
+    """Compile a model's forward pass in place with ``torch.compile``.
+
+    The model class is unchanged (so isinstance checks and attributes such
+    as ``calculate_attention`` still work). If the compiled forward pass
+    fails, the model falls back to eager execution.
+    """
+    if not hasattr(torch, 'compile'):
+        return
+    eager_forward = model.forward
+    # Bag sizes vary between slides, so compile with dynamic shapes.
+    compiled_forward = torch.compile(eager_forward, dynamic=True)
+
+    @functools.wraps(eager_forward)
+    def forward(*args, **kwargs):
+        try:
+            return compiled_forward(*args, **kwargs)
+        except Exception as e:
+            sf.log.warning(
+                "Unable to use compiled MIL model ({}); falling back to "
+                "eager execution.".format(e)
+            )
+            model.forward = eager_forward
+            return eager_forward(*args, **kwargs)
+
+    model.forward = forward
+
+# -----------------------------------------------------------------------------
+
 class MILRenderer(Renderer):
 
     def __init__(self, *args, mil_model_path: Optional[str] = None, **kwargs):
@@ -43,6 +73,11 @@ class MILRenderer(Renderer):
         self.mil_model, self.mil_config = sf.mil.utils.load_model_weights(mil_model_path)
         self.mil_model.to(self.device)
         self._model = self.mil_model
+
+        # Fuse the MIL model's forward pass on GPUs. Compilation happens
+        # lazily during the first prediction.
+        if torch.device(self.device).type == 'cuda':
+            _compile_forward(self.mil_model)
         sf.log.info("Model loading successful")
 
     def _convert_img_to_bag(self, img, res):
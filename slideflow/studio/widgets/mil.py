@@ -5,14 +5,16 @@ import slideflow.mil
 import threading
 import importlib
 import traceback
+import contextlib
 
+from dataclasses import dataclass
 from functools import partial
 from tkinter.filedialog import askdirectory
 from os.path import join, exists, dirname, abspath
-from typing import Dict, Optional, List, Union
+from typing import TYPE_CHECKING, Dict, Optional, List, Union
 from slideflow.util import isnumeric
 from slideflow.mil._params import ModelConfigCLAM, TrainerConfigCLAM
-from slideflow.mil.eval import _predict_clam, _predict_mil
+from slideflow.mil.eval import _predict_clam, _predict_mil, _predict_mil_tiles
 
 from ._utils import Widget
 from .model import draw_tile_predictions
@@ -23,6 +25,9 @@ from ..gui.viewer import SlideViewer
 from ..utils import prediction_to_string
 from .._mil_renderer import MILRenderer, MultimodalMILRenderer
 
+if TYPE_CHECKING:
+    import torch
+
 # -----------------------------------------------------------------------------
 
 RED = (1, 0, 0, 1)
@@ -63,29 +68,82 @@ def _reshape_as_heatmap(
     original_shape: List[int],
     total_elements: int
 ) -> np.ndarray:
-    heatmap = np.full(total_elements, np.nan, dtype=predictions.dtype)
-    heatmap[unmasked_indices] = predictions
-
-    # Reshape and normalize
-    heatmap = heatmap.reshape(original_shape[:2])
-    heatmap = (heatmap - np.nanmin(heatmap)) / (np.nanmax(heatmap) - np.nanmin(heatmap))
-    return heatmap
+    # Normalize the (NaN-free) predictions before scattering,
+    # rather than using nanmin/nanmax over the full grid.
+    # 2D predictions (n_tiles, n_outcomes) are normalized per outcome.
+    heatmap = np.full(
+        (total_elements,) + predictions.shape[1:],
+        np.nan,
+        dtype=predictions.dtype
+    )
+    if predictions.shape[0] == 0:
+        # No unmasked tiles; the heatmap is entirely NaN.
+        return heatmap.reshape(tuple(original_shape[:2]) + predictions.shape[1:])
+    pmin, pmax = predictions.min(axis=0), predictions.max(axis=0)
+    normalized = predictions - pmin
+    normalized /= (pmax - pmin)
+    heatmap[unmasked_indices] = normalized
+    return heatmap.reshape(tuple(original_shape[:2]) + predictions.shape[1:])
+
+@contextlib.contextmanager
+def _inference_context(device):
+    """Disable autograd, and use mixed precision on CUDA devices."""
+    import torch
+    from slideflow.model.torch_utils import autocast
+
+    device_type = torch.device(device).type
+    with torch.inference_mode():
+        with autocast(device_type, mixed_precision=(device_type == 'cuda')):
+            yield
+
+def _pin_bags(bags: np.ndarray, device) -> Union[np.ndarray, "torch.Tensor"]:
+    """Copy bags into pinned memory, for faster transfer to a CUDA device.
+
+    On CUDA devices, MIL inference runs under float16 autocast, so bags are
+    also converted to float16 to halve the host-to-device transfer.
+    """
+    import torch
+
+    if torch.device(device).type != 'cuda':
+        return bags
+    return torch.from_numpy(bags.astype(np.float16)).pin_memory()
 
 def reshape_bags(masked_bags):
     original_shape = masked_bags.shape
     masked_bags = masked_bags.reshape((-1, masked_bags.shape[-1]))
     if len(masked_bags.mask.shape):
-        mask = masked_bags.mask.any(axis=1)
-        valid_indices = np.where(~mask)
-        bags = masked_bags[valid_indices]
+        # Tiles are masked across all features, so the first feature
+        # column is sufficient to identify masked tiles.
+        valid_indices = np.flatnonzero(~masked_bags.mask[:, 0])
+        bags = masked_bags.data[valid_indices]
     else:
         valid_indices = np.arange(masked_bags.shape[0])
-        bags = masked_bags
-    bags = np.expand_dims(bags, axis=0).astype(np.float32)
+        bags = masked_bags.data
+    # Convert to float32 without an extra copy if already float32.
+    bags = np.ascontiguousarray(bags, dtype=np.float32)[np.newaxis]
     return bags, original_shape, valid_indices, masked_bags.shape[0]
 
 # -----------------------------------------------------------------------------
 
+@dataclass(frozen=True)
+class _AttentionThresholds:
+    """Attention thresholds from an MIL model's parameters."""
+
+    low: Optional[float] = None
+    high: Optional[float] = None
+    range: Optional[List[float]] = None
+
+    @classmethod
+    def from_params(cls, mil_params: Dict) -> "_AttentionThresholds":
+        thresh = (mil_params.get('thresholds') or {}).get('attention') or {}
+        return cls(
+            low=thresh.get('low'),
+            high=thresh.get('high'),
+            range=thresh.get('range')
+        )
+
+# -----------------------------------------------------------------------------
+
 class _AttentionHeatmapWrapper:
 
     def __init__(self, attention: np.ndarray, slide: "sf.WSI"):
@@ -108,11 +166,17 @@ class _AttentionHeatmapWrapper:
         """
         if path is None:
             path = f'{self.slide.name}.npz'
-        np.savez(path, predictions=self.attention)
+        np.savez_compressed(path, predictions=self.attention)
         return path
 
-    def load(self):
-        raise NotImplementedError("Not yet implemented.")
+    def load(self, path: str) -> None:
+        """Load attention heatmap from a .npz file.
+
+        Args:
+            path (str): Source .npz file. Must have a 'predictions' key.
+        """
+        with np.load(path) as npzfile:
+            self.attention = npzfile['predictions']
 
 # -----------------------------------------------------------------------------
 
@@ -139,7 +203,10 @@ class MILWidget(Widget):
         self.mil_config = None
         self.mil_params = None
         self.extractor_params = None
+        self._outcome_labels = []
+        self._attention_thresholds = _AttentionThresholds()
         self.calculate_attention = True
+        self.calculate_tile_predictions = True
 
         # Predictions and attention.
         self.predictions = None
@@ -157,6 +224,8 @@ class MILWidget(Widget):
         self._progress_count = [0]
         self._multimodal_stride = [1]
         self._capturing_stride = [None]
+        self._pred_message_source = None
+        self._pred_message = None
 
     def _refresh_generating_prediction(self):
         """Refresh render of asynchronous MIL prediction / attention heatmap."""
@@ -313,6 +382,9 @@ class MILWidget(Widget):
         try:
             self.close(close_renderer=False)
             self.mil_params = _get_mil_params(path)
+            self._attention_thresholds = _AttentionThresholds.from_params(
+                self.mil_params
+            )
             self.mil_config = sf.mil.mil_config(trainer=self.mil_params['trainer'],
                                                 **self.mil_params['params'])
             self.extractor_params = self.mil_params['bags_extractor']
@@ -351,26 +423,56 @@ class MILWidget(Widget):
 
     def _calculate_predictions(self, bags, **kwargs):
         """Calculate MIL predictions and attention from a set of bags."""
+        device = self.viz._render_manager.device
+        with _inference_context(device):
+            if (isinstance(self.mil_config, TrainerConfigCLAM)
+            or isinstance(self.mil_config.model_config, ModelConfigCLAM)):
+                predictions, attention = _predict_clam(
+                    self.model,
+                    bags,
+                    attention=self.calculate_attention,
+                    device=device,
+                    **kwargs
+                )
+            else:
+                predictions, attention = _predict_mil(
+                    self.model,
+                    bags,
+                    attention=self.calculate_attention,
+                    use_lens=self.mil_config.model_config.use_lens,
+                    apply_softmax=self.mil_config.model_config.apply_softmax,
+                    device=device,
+                    **kwargs
+                )
+        predictions = predictions.astype(np.float32, copy=False)
+        attention = [a.astype(np.float32, copy=False) for a in attention]
+        return predictions, attention
+
+    def _calculate_tile_predictions(self, bags, batch_size=4096):
+        """Calculate MIL predictions for each tile in a bag of shape
+        (1, n_tiles, n_feats), treating each tile as a single-tile bag."""
         if (isinstance(self.mil_config, TrainerConfigCLAM)
         or isinstance(self.mil_config.model_config, ModelConfigCLAM)):
-            predictions, attention = _predict_clam(
-                self.model,
-                bags,
-                attention=self.calculate_attention,
-                device=self.viz._render_manager.device,
-                **kwargs
-            )
-        else:
-            predictions, attention = _predict_mil(
-                self.model,
-                bags,
-                attention=self.calculate_attention,
-                use_lens=self.mil_config.model_config.use_lens,
-                apply_softmax=self.mil_config.model_config.apply_softmax,
-                device=self.viz._render_manager.device,
-                **kwargs
-            )
-        return predictions, attention
+            # CLAM models only accept one bag per forward pass.
+            reshaped_bags = bags.reshape(bags.shape[1], 1, bags.shape[2])
+            tile_predictions, _ = self._calculate_predictions(reshaped_bags)
+            return tile_predictions
+
+        # Run tiles through the model in batches of single-tile bags,
+        # rather than one forward pass per tile.
+        device = self.viz._render_manager.device
+        with _inference_context(device):
+            tile_predictions = [
+                _predict_mil_tiles(
+                    self.model,
+                    bags[0][i: i + batch_size],
+                    use_lens=self.mil_config.model_config.use_lens,
+                    apply_softmax=self.mil_config.model_config.apply_softmax,
+                    device=device,
+                )[0]
+                for i in range(0, bags.shape[1], batch_size)
+            ]
+        return np.concatenate(tile_predictions, axis=0).astype(np.float32, copy=False)
 
     def _progress_callback(self, grid_idx, bar_id=0, max_val=None):
         self._progress_count[bar_id] += len(grid_idx)
@@ -464,21 +566,18 @@ class MILWidget(Widget):
             **viz.slide_widget.get_tile_filter_params(),
             **mp_kw
         )
-        original_shape = masked_bags.shape
-        masked_bags = masked_bags.reshape((-1, masked_bags.shape[-1]))
-        if len(masked_bags.mask.shape):
-            mask = masked_bags.mask.any(axis=1)
-            valid_indices = np.where(~mask)[0]
-            bags = masked_bags[valid_indices]
-        else:
-            valid_indices = np.arange(masked_bags.shape[0])
-            bags = masked_bags
-        bags = np.expand_dims(bags, axis=0).astype(np.float32)
+        bags, original_shape, valid_indices, total_tiles = reshape_bags(masked_bags)
+
+        # Release the full (masked) feature grid before MIL inference.
+        del masked_bags
 
         sf.log.info("Generated feature bags for {} tiles".format(bags.shape[1]))
 
         # Generate slide-level prediction and attention.
-        self.predictions, self.attention = self._calculate_predictions(bags)
+        device = self.viz._render_manager.device
+        self.predictions, self.attention = self._calculate_predictions(
+            _pin_bags(bags, device)
+        )
         if self.attention:
             self.attention = self.attention[0]
         else:
@@ -492,24 +591,27 @@ class MILWidget(Widget):
         self.attention = self.attention[self.attention != 0]
         sf.log.debug("Total tiles after masking: {}".format(len(self.attention)))
 
+        # Tile-level predictions require a second MIL forward pass over
+        # every tile; skip them if only slide-level results are needed.
+        if not self.calculate_tile_predictions:
+            if self.attention is not None:
+                self.render_attention_heatmap(_reshape_as_heatmap(
+                    self.attention, valid_indices, original_shape, total_tiles
+                ))
+            return
+
         # Generate tile-level predictions.
-        # Reshape the bags from (1, n_bags, n_feats) to (n_bags, 1, n_feats)
-        reshaped_bags = np.reshape(bags, (bags.shape[1], 1, bags.shape[2]))
-        tile_predictions, _ = self._calculate_predictions(reshaped_bags)
+        tile_predictions = self._calculate_tile_predictions(
+            _pin_bags(bags, device)
+        )
 
         # Create heatmaps from tile predictions and attention
-        if len(tile_predictions.shape) == 2:
-            tile_heatmap = np.stack([
-                _reshape_as_heatmap(tile_predictions[:, n], valid_indices, original_shape, masked_bags.shape[0])
-                for n in range(tile_predictions.shape[1])
-            ], axis=2)
-        else:
-            tile_heatmap = _reshape_as_heatmap(
-                tile_predictions, valid_indices, original_shape, masked_bags.shape[0]
-            )
+        tile_heatmap = _reshape_as_heatmap(
+            tile_predictions, valid_indices, original_shape, total_tiles
+        )
         if self.attention is not None:
             att_heatmap = _reshape_as_heatmap(
-                self.attention, valid_indices, original_shape, masked_bags.shape[0]
+                self.attention, valid_indices, original_shape, total_tiles
             )
             self.render_dual_heatmap(att_heatmap, tile_heatmap)
         else:
@@ -566,8 +668,10 @@ class MILWidget(Widget):
             raise ValueError("Attention and tile_preds must have the same shape.")
 
         self.viz.heatmap = _AttentionHeatmapWrapper(attention, self.viz.wsi)
-        self.viz.heatmap_widget.predictions = convert_to_overlays(
-            np.concatenate((attention[:, :, np.newaxis], tile_preds), axis=2)
+        # Overlays are views of each channel, so build them directly rather
+        # than concatenating attention and tile predictions into a new array.
+        self.viz.heatmap_widget.predictions = (
+            [HeatmapOverlay(attention)] + convert_to_overlays(tile_preds)
         )
         pred_outcomes = self.viz.heatmap_widget.get_outcome_names(self.mil_params)
         self.viz.heatmap_widget.render_heatmap(outcome_names=["Attention"] + pred_outcomes)
@@ -650,12 +754,14 @@ class MILWidget(Widget):
         assert len(self.predictions) == 1
         prediction = self.predictions[0]
 
-        # Assemble outcome category labels.
-        outcome_labels = [
-            f"Outcome {i}" if 'outcome_labels' not in self.mil_params or str(i) not in self.mil_params['outcome_labels']
-                           else self.mil_params['outcome_labels'][str(i)]
-            for i in range(len(prediction))
-        ]
+        # Assemble outcome category labels once per loaded model.
+        if len(self._outcome_labels) != len(prediction):
+            labels = self.mil_params.get('outcome_labels') or {}
+            self._outcome_labels = [
+                labels.get(str(i), f"Outcome {i}")
+                for i in range(len(prediction))
+            ]
+        outcome_labels = self._outcome_labels
 
         # Show prediction for each category.
         imgui.text(self.mil_params['outcomes'])
@@ -697,7 +803,7 @@ class MILWidget(Widget):
     def update_attention_color(self):
         viz = self.viz
         val = viz._uncertainty
-        c = self.mil_params
+        thresh = self._attention_thresholds
 
         if not self.model_loaded:
             return
@@ -711,23 +817,16 @@ class MILWidget(Widget):
 
         # Has thresholds.
         elif isnumeric(val):
-            if 'thresholds' in c and 'attention' in c['thresholds']:
-                thresh = c['thresholds']['attention']
-                if 'low' in thresh and val < thresh['low']:
-                    color = RED
-                elif 'high' in thresh and val > thresh['high']:
-                    color = GREEN
-                elif 'low' in thresh and 'high' in thresh:
-                    color = YELLOW
-                else:
-                    color = GRAY
+            if thresh.low is not None and val < thresh.low:
+                color = RED
+            elif thresh.high is not None and val > thresh.high:
+                color = GREEN
+            elif thresh.low is not None and thresh.high is not None:
+                color = YELLOW
+            else:
+                color = GRAY
 
-        if ('thresholds' in c
-            and 'attention' in c['thresholds']
-            and 'range' in c['thresholds']['attention']):
-            self.uncertainty_range = c['thresholds']['attention']['range']
-        else:
-            self.uncertainty_range = None
+        self.uncertainty_range = thresh.range
 
         self.uncertainty_color = color
         viz._box_color = color[0:3]
@@ -766,6 +865,9 @@ class MILWidget(Widget):
                 self.draw_mil_info()
             if viz.collapsing_header('Whole-slide Prediction', default=True):
                 self.draw_prediction()
+                _, self.calculate_tile_predictions = imgui.checkbox(
+                    "Tile-level heatmap", self.calculate_tile_predictions
+                )
                 predict_enabled = (viz.wsi is not None
                                    and self.model_loaded
                                    and not self._triggered)
@@ -792,9 +894,13 @@ class MILWidget(Widget):
             self.draw_mil_params_popup()
 
         if (viz._predictions is not None) and self.model_loaded:
-            pred_str = prediction_to_string(
-                predictions=viz._predictions,
-                outcomes=self.mil_params['outcome_labels'],
-                is_categorical=self.is_categorical()
-            )
-            viz.set_prediction_message(pred_str)
+            # Only rebuild the message when the predictions change,
+            # rather than on every frame.
+            if self._pred_message_source is not viz._predictions:
+                self._pred_message = prediction_to_string(
+                    predictions=viz._predictions,
+                    outcomes=self.mil_params['outcome_labels'],
+                    is_categorical=self.is_categorical()
+                )
+                self._pred_message_source = viz._predictions
+            viz.set_prediction_message(self._pred_message)
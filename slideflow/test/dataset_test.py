@@ -1,11 +1,16 @@
 import logging
+import os
 import random
 import shutil
+import tempfile
 import unittest
 
+import numpy as np
 import pandas as pd
 import slideflow as sf
 from slideflow.test.utils import TestConfig
+from slideflow.tfrecord.reader import tfrecord_loader
+from slideflow.tfrecord.writer import TFRecordWriter
 
 
 class TestDataset(unittest.TestCase):
@@ -299,6 +304,53 @@ class TestLabels(unittest.TestCase):
             self.assertTrue(all([isinstance(lbl[cat_idx], str) for lbl in labels.values()]))
             self.assertTrue(all([isinstance(lbl, str) for lbl in unique['category1']]))
 
+
+class TestTFRecordReader(unittest.TestCase):
+
+    # The second record is larger than the default 1 MiB read buffer.
+    record_sizes = (100, 3 * 1024 * 1024, 50)
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.tmpdir = tempfile.mkdtemp()  # type: ignore
+        cls.path = os.path.join(cls.tmpdir, 'test.tfrecords')  # type: ignore
+        rng = np.random.default_rng(0)
+        cls.images = [  # type: ignore
+            rng.integers(0, 256, size=n, dtype=np.uint8).tobytes()
+            for n in cls.record_sizes
+        ]
+        writer = TFRecordWriter(cls.path)  # type: ignore
+        for i, image in enumerate(cls.images):  # type: ignore
+            writer.write({
+                'image_raw': (image, 'byte'),
+                'loc_x': (i, 'int'),
+            })
+        writer.close()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        shutil.rmtree(cls.tmpdir)  # type: ignore
+
+    def _assert_records(self, records):
+        self.assertEqual(len(records), len(self.images))
+        for i, (record, image) in enumerate(zip(records, self.images)):
+            self.assertEqual(record['image_raw'].tobytes(), image)
+            self.assertEqual(int(record['loc_x'][0]), i)
+
+    def test_read_record_larger_than_buffer(self):
+        loader = tfrecord_loader(self.path)
+        self._assert_records(list(loader))
+        loader.close()
+
+    def test_read_buffer_grows_in_place(self):
+        datum_bytes = bytearray(16)
+        loader = tfrecord_loader(self.path, datum_bytes=datum_bytes)
+        self._assert_records(list(loader))
+        loader.close()
+        # The shared buffer is grown in place to fit the largest record.
+        self.assertGreaterEqual(len(datum_bytes), max(self.record_sizes))
+
 # -----------------------------------------------------------------------------
 
 if __name__ == '__main__':
@@ -0,0 +1,223 @@
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import slideflow as sf
+
+
+def _random_features(slides, n_tiles=10, n_features=8, seed=0):
+    rng = np.random.default_rng(seed)
+    ftrs = sf.DatasetFeatures(None, None)
+    ftrs.slides = list(slides)
+    ftrs.activations = {
+        s: rng.random((n_tiles, n_features), dtype=np.float32) for s in slides
+    }
+    ftrs.predictions = {
+        s: rng.random((n_tiles, 2), dtype=np.float32) for s in slides
+    }
+    ftrs.uncertainty = {
+        s: rng.random((n_tiles, 2), dtype=np.float32) for s in slides
+    }
+    ftrs.locations = {
+        s: rng.integers(0, 10000, size=(n_tiles, 2)) for s in slides
+    }
+    ftrs.num_features = n_features
+    ftrs.num_classes = 2
+    return ftrs
+
+
+class TestFeaturesCache(unittest.TestCase):
+
+    slides = ['slide0', 'slide1', 'slide2']
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._orig_logging_level = sf.getLoggingLevel()  # type: ignore
+        sf.setLoggingLevel(40)
+        cls.tmpdir = tempfile.mkdtemp()  # type: ignore
+        cls.features = _random_features(cls.slides)  # type: ignore
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        sf.setLoggingLevel(cls._orig_logging_level)  # type: ignore
+        shutil.rmtree(cls.tmpdir)  # type: ignore
+        return super().tearDownClass()
+
+    def _load(self, path, **kwargs):
+        loaded = sf.DatasetFeatures(None, None)
+        loaded.slides = list(self.slides)
+        loaded.load_cache(path, **kwargs)
+        return loaded
+
+    def _assert_identical(self, loaded):
+        for attr in ('activations', 'predictions', 'uncertainty', 'locations'):
+            expected = getattr(self.features, attr)
+            actual = getattr(loaded, attr)
+            self.assertEqual(sorted(actual.keys()), sorted(expected.keys()))
+            for s in self.slides:
+                self.assertEqual(actual[s].dtype, expected[s].dtype)
+                np.testing.assert_array_equal(actual[s], expected[s])
+
+    def test_cache_roundtrip(self):
+        path = os.path.join(self.tmpdir, 'cache.pkl')
+        self.features.save_cache(path)
+        self._assert_identical(self._load(path, mmap=False))
+
+    def test_cache_roundtrip_mmap(self):
+        path = os.path.join(self.tmpdir, 'cache_mmap.pkl')
+        self.features.save_cache(path)
+        loaded = self._load(path, mmap=True)
+        self._assert_identical(loaded)
+        # Memory-mapped pages are copy-on-write, so arrays remain writable.
+        loaded.activations[self.slides[0]][0, 0] = -1
+        np.testing.assert_array_equal(
+            self._load(path, mmap=True).activations[self.slides[0]],
+            self.features.activations[self.slides[0]]
+        )
+
+    def test_load_legacy_cache(self):
+        # Caches from older versions are a single in-band pickle.
+        path = os.path.join(self.tmpdir, 'cache_legacy.pkl')
+        with open(path, 'wb') as f:
+            pickle.dump([self.features.activations,
+                         self.features.predictions,
+                         self.features.uncertainty,
+                         self.features.locations], f)
+        self._assert_identical(self._load(path, mmap=False))
+        self._assert_identical(self._load(path, mmap=True))
+
+    def test_cache_default_is_bit_exact(self):
+        path = os.path.join(self.tmpdir, 'cache_exact.pkl')
+        self.features.save_cache(path, dtype=None)
+        loaded = self._load(path, mmap=False)
+        for s in self.slides:
+            self.assertEqual(
+                loaded.activations[s].tobytes(),
+                self.features.activations[s].tobytes()
+            )
+
+    def _assert_quantized(self, dtype, atol_fn):
+        path = os.path.join(self.tmpdir, f'cache_{dtype}.pkl')
+        self.features.save_cache(path, dtype=dtype)
+        loaded = self._load(path, mmap=False)
+        for s in self.slides:
+            expected = self.features.activations[s]
+            actual = loaded.activations[s]
+            self.assertEqual(actual.dtype, np.float32)
+            self.assertEqual(actual.shape, expected.shape)
+            err = np.abs(actual - expected)
+            self.assertTrue(np.all(err <= atol_fn(expected)))
+        # Other arrays are not quantized.
+        for attr in ('predictions', 'uncertainty', 'locations'):
+            for s in self.slides:
+                np.testing.assert_array_equal(
+                    getattr(loaded, attr)[s], getattr(self.features, attr)[s]
+                )
+
+    def test_cache_int8(self):
+        # Half a quantization step per feature, with float32 rounding slack.
+        def atol(a):
+            step = (a.max(axis=0) - a.min(axis=0)) / 255
+            return step / 2 * (1 + 1e-3) + 1e-6
+        self._assert_quantized('int8', atol)
+
+    def test_cache_float16(self):
+        # float16 has an 11-bit significand.
+        self._assert_quantized('float16', lambda a: np.abs(a) * 2**-11 + 1e-7)
+
+
+def _reference_concat(features):
+    """Concatenate DatasetFeatures by an inner join on
+    (slide, location, TFRecord index), as in earlier versions."""
+    tables = [
+        {
+            (s, tuple(loc), i): ftrs.activations[s][i]
+            for s in ftrs.slides
+            for i, loc in enumerate(np.asarray(ftrs.locations[s]).tolist())
+        }
+        for ftrs in features
+    ]
+    keys = sorted(
+        set(tables[0]).intersection(*tables[1:]),
+        key=lambda k: (k[0], k[2])
+    )
+    ref = {}  # type: dict
+    for key in keys:
+        locs, acts = ref.setdefault(key[0], ([], []))
+        locs.append(key[1])
+        acts.append(np.concatenate([t[key] for t in tables]))
+    return {s: (np.array(l), np.stack(a)) for s, (l, a) in ref.items()}
+
+
+class TestFeaturesConcat(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._orig_logging_level = sf.getLoggingLevel()  # type: ignore
+        sf.setLoggingLevel(40)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        sf.setLoggingLevel(cls._orig_logging_level)  # type: ignore
+        return super().tearDownClass()
+
+    def _assert_matches_reference(self, features):
+        result = sf.DatasetFeatures.concat(features)
+        expected = _reference_concat(features)
+        self.assertEqual(sorted(result.slides), sorted(expected.keys()))
+        for s, (locs, acts) in expected.items():
+            np.testing.assert_array_equal(np.asarray(result.locations[s]), locs)
+            np.testing.assert_array_equal(result.activations[s], acts)
+        self.assertEqual(
+            result.num_features,
+            sum(ftrs.num_features for ftrs in features)
+        )
+        self.assertFalse(result.predictions)
+        self.assertFalse(result.uncertainty)
+        return result
+
+    def test_concat_identical_slides(self):
+        f1 = _random_features(['a', 'b'], n_features=4, seed=1)
+        f2 = _random_features(['a', 'b'], n_features=3, seed=2)
+        f2.locations = {s: f1.locations[s].copy() for s in f1.slides}
+        result = self._assert_matches_reference([f1, f2])
+        self.assertEqual(
+            sum(len(result.activations[s]) for s in result.slides), 20
+        )
+
+    def test_concat_overlapping_and_disjoint_slides(self):
+        # Slide 'a' is shared, with some mismatched tile locations;
+        # slides 'b' and 'c' are each present in only one object.
+        f1 = _random_features(['a', 'b'], n_features=4, seed=1)
+        f2 = _random_features(['a', 'c'], n_features=3, seed=2)
+        f2.locations['a'] = f1.locations['a'].copy()
+        f2.locations['a'][[2, 4]] += 1
+        result = self._assert_matches_reference([f1, f2])
+        self.assertEqual(result.slides, ['a'])
+        self.assertEqual(len(result.activations['a']), 8)
+
+    def test_concat_three(self):
+        f1 = _random_features(['a', 'b'], n_features=4, seed=1)
+        f2 = _random_features(['a', 'b'], n_features=3, seed=2)
+        f3 = _random_features(['a', 'c'], n_features=2, seed=3)
+        f2.locations = {s: f1.locations[s].copy() for s in f1.slides}
+        f2.locations['a'][0] += 1
+        f3.locations['a'] = f1.locations['a'].copy()
+        f3.locations['a'][5] += 1
+        result = self._assert_matches_reference([f1, f2, f3])
+        self.assertEqual(result.slides, ['a'])
+        self.assertEqual(len(result.activations['a']), 8)
+
+    def test_concat_different_lengths(self):
+        f1 = _random_features(['a', 'b'], n_tiles=10, seed=1)
+        f2 = _random_features(['a', 'b'], n_tiles=9, seed=2)
+        with self.assertRaises(ValueError):
+            sf.DatasetFeatures.concat([f1, f2])
+
+# -----------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    unittest.main()
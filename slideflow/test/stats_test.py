@@ -290,7 +290,62 @@ class TestMetrics(unittest.TestCase):
             metrics = sf.stats.metrics.cph_metrics(_df, level=level)
             self._assert_cph_metrics(metrics)
 
-# -----------------------------------------------------------------------------# -----------------------------------------------------------------------------
+
+class TestFeatureStats(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls._orig_logging_level = sf.getLoggingLevel()  # type: ignore
+        sf.setLoggingLevel(40)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        sf.setLoggingLevel(cls._orig_logging_level)  # type: ignore
+        return super().tearDownClass()
+
+    def _features(self) -> sf.DatasetFeatures:
+        ftrs = sf.DatasetFeatures(None, None)
+        ftrs.slides = ['s1', 's2', 's3', 's4']
+        ftrs.labels = {'s1': 'a', 's2': 'b', 's3': 'a', 's4': 'b'}
+        ftrs.categories = ['a', 'b']
+        ftrs.used_categories = ['a', 'b']
+        ftrs.activations = {
+            's1': np.array([[0.9, 0.1, 0.6],
+                            [0.2, 0.8, 0.7],
+                            [0.7, 0.3, 0.1],
+                            [0.1, 0.2, 0.9]]),
+            's2': np.array([[0.6, 0.6, 0.6],
+                            [0.4, 0.4, 0.4]]),
+            's3': np.array([[0.6, 0.4, 0.6]]),
+            's4': np.array([[0.1, 0.9, 0.2],
+                            [0.3, 0.7, 0.8],
+                            [0.9, 0.9, 0.9]]),
+        }
+        ftrs.num_features = 3
+        return ftrs
+
+    def test_threshold_stats(self):
+        # Fraction of each slide's tiles with a feature value above 0.5.
+        _, _, category_stats = self._features().stats(
+            method='threshold', threshold=0.5
+        )
+        self.assertTrue(np.allclose(
+            category_stats[0], [[2/4, 1/4, 3/4], [1, 0, 1]]
+        ))
+        self.assertTrue(np.allclose(
+            category_stats[1], [[1/2, 1/2, 1/2], [1/3, 1, 2/3]]
+        ))
+
+    def test_mean_stats(self):
+        _, _, category_stats = self._features().stats(method='mean')
+        self.assertTrue(np.allclose(
+            category_stats[0], [[0.475, 0.35, 0.575], [0.6, 0.4, 0.6]]
+        ))
+        self.assertTrue(np.allclose(
+            category_stats[1], [[0.5, 0.5, 0.5], [1.3/3, 2.5/3, 1.9/3]]
+        ))
+
+# -----------------------------------------------------------------------------
 
 if __name__ == '__main__':
     unittest.main()
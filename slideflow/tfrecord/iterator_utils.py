@@ -2,6 +2,8 @@
 
 from __future__ import division
 
+import queue
+import threading
 import typing
 import warnings
 
@@ -25,6 +27,109 @@ def cycle(iterator):
             raise EmptyIterator
 
 
+def _iter_on_read(loader):
+    """Iterate over a loader, calling iter() only when first read."""
+    yield from loader
+
+
+class LazyLoader:
+    """Create a loader from a factory when it is first iterated.
+
+    The created loader is reused for subsequent passes.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.loader = None
+
+    def __iter__(self):
+        if self.loader is None:
+            self.loader = self.factory()
+        return iter(self.loader)
+
+    def close(self):
+        if self.loader is not None:
+            self.loader.close()
+            self.loader = None
+
+
+class PrefetchIterator:
+    """Iterate over a loader in a background thread.
+
+    Up to ``depth`` items are read ahead into a queue, so that reading and
+    parsing records overlaps with downstream processing. Each call to
+    ``__iter__`` starts a new pass over the loader, with its own thread.
+    The thread is stopped and joined when the pass ends, is closed, or is
+    garbage collected.
+    """
+
+    _END = object()
+
+    def __init__(self, loader, depth):
+        self.loader = loader
+        self.depth = depth
+        self._closed = threading.Event()
+        self._threads = set()  # type: typing.Set[threading.Thread]
+
+    def _stopped(self, stop):
+        return stop.is_set() or self._closed.is_set()
+
+    def _put(self, q, item, stop):
+        """Put an item on the queue, returning False if stopped."""
+        while not self._stopped(stop):
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _worker(self, q, stop):
+        try:
+            for item in self.loader:
+                if not self._put(q, item, stop):
+                    return
+        except Exception as e:
+            if not self._stopped(stop):
+                self._put(q, e, stop)
+            return
+        self._put(q, self._END, stop)
+
+    def __iter__(self):
+        q = queue.Queue(maxsize=self.depth)  # type: queue.Queue
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self._worker, args=(q, stop), daemon=True
+        )
+        self._threads.add(thread)
+        thread.start()
+        try:
+            while True:
+                try:
+                    item = q.get(timeout=0.1)
+                except queue.Empty:
+                    # The worker exits without queueing an end marker
+                    # only if the iterator was closed.
+                    if not thread.is_alive() and q.empty():
+                        return
+                    continue
+                if item is self._END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            thread.join()
+            self._threads.discard(thread)
+
+    def close(self):
+        self._closed.set()
+        for thread in list(self._threads):
+            thread.join()
+        self.loader.close()
+
+
 class RandomSampler:
     def __init__(self, loaders, ratios, infinite=True, shard=None):
 
@@ -37,7 +142,9 @@ class RandomSampler:
         if self.infinite:
             iterators = [cycle(loader) for loader in self.loaders]
         else:
-            iterators = [iter(loader) for loader in self.loaders]
+            # Defer iter() until first read, so that lazily created
+            # loaders are only opened when sampled.
+            iterators = [_iter_on_read(loader) for loader in self.loaders]
         self.ratios = np.array(self.ratios)
         self.ratios = self.ratios / self.ratios.sum()
         ratio_indices = np.array(range(len(self.ratios)))
@@ -5,38 +5,71 @@ from __future__ import absolute_import
 import gzip
 import io
 import os
-import struct
 import numpy as np
 import slideflow as sf
 
-from typing import Dict, Iterable, List, Optional, Tuple, Union
+from functools import partial
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
 from slideflow.tfrecord import iterator_utils
-from slideflow.util import example_pb2, extract_feature_dict, tfrecord2idx, log
+from slideflow.util import (
+    example_pb2, extract_feature_dict, feature_typename,
+    decode_feature_value, resolve_feature_description, tfrecord2idx, log
+)
 
 # -----------------------------------------------------------------------------
 
-def _read_data(file, length_bytes, crc_bytes, datum_bytes) -> memoryview:
-    """Read the next record from the tfrecord file."""
-    if file.readinto(length_bytes) != 8:
+# Read buffer size for sequential TFRecord iteration. Records are small
+# (one tile each), so a larger buffer lets each read() syscall cover many
+# records. Kept modest because many TFRecords may be open at once when
+# interleaving.
+SEQUENTIAL_READ_BUFFER = 256 * 1024
+
+# -----------------------------------------------------------------------------
+
+def _read_data(file, header_bytes, datum_bytes) -> memoryview:
+    """Read the next record from the tfrecord file.
+
+    Each record is framed as an 8-byte length and a 4-byte length CRC
+    (read together into ``header_bytes``), the data, and a 4-byte data CRC.
+    CRCs are not verified, so the trailing CRC is skipped with a seek.
+    """
+    n_read = file.readinto(header_bytes)
+    if n_read < 8:
         raise RuntimeError("Failed to read the record size.")
-    if file.readinto(crc_bytes) != 4:
+    if n_read != 12:
         raise RuntimeError("Failed to read the start token.")
-    length, = struct.unpack("<Q", length_bytes)
+    length = int.from_bytes(header_bytes[:8], 'little')
     if length > len(datum_bytes):
         try:
             _fill = int(length * 1.5)
-            datum_bytes = datum_bytes.zfill(_fill)
-        except OverflowError:
+            # Grow the shared buffer in place (with zero bytes), so the
+            # larger size is kept for subsequent records.
+            datum_bytes.extend(bytes(_fill - len(datum_bytes)))
+        except BufferError:
+            # The buffer cannot be resized while a view of a previous
+            # record is still referenced; use a new buffer for this record.
+            datum_bytes = bytearray(_fill)
+        except (OverflowError, MemoryError):
             raise OverflowError('Overflow encountered reading tfrecords; please '
                                 'try regenerating index files')
     datum_bytes_view = memoryview(datum_bytes)[:length]
     if file.readinto(datum_bytes_view) != length:
         raise RuntimeError("Failed to read the record.")
-    if file.readinto(crc_bytes) != 4:
-        raise RuntimeError("Failed to read the end token.")
+    file.seek(4, io.SEEK_CUR)
     return datum_bytes_view
 
+def _shard_bounds(n: int, shard_idx: int, shard_count: int) -> Tuple[int, int]:
+    """Return the (start, end) positions of a shard of ``n`` items.
+
+    Equivalent to the bounds of ``np.array_split(range(n), shard_count)``,
+    without allocating each shard.
+    """
+    size, extra = divmod(n, shard_count)
+    start = shard_idx * size + min(shard_idx, extra)
+    end = start + size + (1 if shard_idx < extra else 0)
+    return start, end
+
 # -----------------------------------------------------------------------------
 
 class TFRecord:
@@ -150,13 +183,16 @@ class TFRecord:
 
 # -----------------------------------------------------------------------------
 
+# Maps feature description typenames to the set field of a Feature.
+TYPENAME_MAPPING = {
+    "byte": "bytes_list",
+    "float": "float_list",
+    "int": "int64_list"
+}
+
 
 class TFRecordIterator:
-    typename_mapping = {
-        "byte": "bytes_list",
-        "float": "float_list",
-        "int": "int64_list"
-    }
+    typename_mapping = TYPENAME_MAPPING
 
     def __init__(
         self,
@@ -200,7 +236,9 @@ class TFRecordIterator:
         if compression_type == "gzip":
             self.file = gzip.open(data_path, 'rb')
         elif compression_type is None:
-            self.file = io.open(data_path, 'rb')  # type: ignore
+            self.file = io.open(  # type: ignore
+                data_path, 'rb', buffering=SEQUENTIAL_READ_BUFFER
+            )
         else:
             raise ValueError("compression_type should be 'gzip' or None")
 
@@ -212,8 +250,7 @@ class TFRecordIterator:
             self.datum_bytes = datum_bytes
         else:
             self.datum_bytes = bytearray(1024 * 1024)
-        self.length_bytes = bytearray(8)
-        self.crc_bytes = bytearray(4)
+        self.header_bytes = bytearray(12)
         self.index = index
         self.index_is_nonsequential = None
         if self.index is not None and len(self.index) != 0:
@@ -239,8 +276,11 @@ class TFRecordIterator:
             self.file.seek(start_offset)
         if end_offset is None:
             end_offset = os.path.getsize(self.data_path)
-        while self.file.tell() < end_offset:
-            yield self._read_next_data()
+        # Bind per-record lookups to locals for the loop.
+        tell = self.file.tell
+        read_next_data = self._read_next_data
+        while tell() < end_offset:
+            yield read_next_data()
 
     def _read_nonsequential_records(self, start_offset=None, end_offset=None):
         """Read nonsequential records from the given starting byte.
@@ -258,15 +298,21 @@ class TFRecordIterator:
         if end_offset is None:
             end_offset = os.path.getsize(self.data_path)
 
-        while self.index[index_loc] < end_offset:
-            if self.file.tell() != self.index[index_loc]:
-                self.file.seek(self.index[index_loc])
-
-            yield self._read_next_data()
+        # Bind per-record lookups to locals for the loop.
+        index = self.index
+        n_index = len(index)
+        tell = self.file.tell
+        seek = self.file.seek
+        read_next_data = self._read_next_data
+        while index[index_loc] < end_offset:
+            if tell() != index[index_loc]:
+                seek(index[index_loc])
+
+            yield read_next_data()
             index_loc += 1
 
             # End the loop if we have reached the last index
-            if index_loc >= len(self.index):
+            if index_loc >= n_index:
                 break
 
     def _read_next_data(self) -> memoryview:
@@ -274,8 +320,7 @@ class TFRecordIterator:
         try:
             data = _read_data(
                 self.file,
-                self.length_bytes,
-                self.crc_bytes,
+                self.header_bytes,
                 self.datum_bytes
             )
         except Exception as e:
@@ -322,21 +367,23 @@ class TFRecordIterator:
                 yield from self.read_records(0, clip_offset)
             else:
                 shard_idx, shard_count = self.shard
-                all_shard_indices = np.array_split(self.index, shard_count)
                 if shard_count >= self.index.shape[0]:  # type: ignore
                     # There are fewer records than shards, so
                     # only the first shard will read
                     if shard_idx == 0:
-                        start_byte = all_shard_indices[shard_idx][0]
+                        start_byte = self.index[0]
                         yield from self.read_records(start_byte, clip_offset)
                         return
                     else:
                         return
-                elif shard_idx < (shard_count-1):
-                    end_byte = all_shard_indices[shard_idx + 1][0]
+                start, end = _shard_bounds(
+                    len(self.index), shard_idx, shard_count
+                )
+                if shard_idx < (shard_count-1):
+                    end_byte = self.index[end]
                 else:
                     end_byte = clip_offset
-                start_byte = all_shard_indices[shard_idx][0]
+                start_byte = self.index[start]
                 yield from self.read_records(start_byte, end_byte)
 
     def process(self, record):
@@ -347,11 +394,7 @@ class TFRecordIterator:
 
 
 class IndexedTFRecordIterator:
-    typename_mapping = {
-        "byte": "bytes_list",
-        "float": "float_list",
-        "int": "int64_list"
-    }
+    typename_mapping = TYPENAME_MAPPING
 
     def __init__(
         self,
@@ -377,8 +420,7 @@ class IndexedTFRecordIterator:
             self.datum_bytes = datum_bytes
         else:
             self.datum_bytes = bytearray(1024 * 1024)
-        self.length_bytes = bytearray(8)
-        self.crc_bytes = bytearray(4)
+        self.header_bytes = bytearray(12)
 
         # For the case that there is only a single record in the file.
         if len(self.index.shape) == 1:
@@ -394,7 +436,8 @@ class IndexedTFRecordIterator:
         # Shard.
         if shard is not None:
             shard_idx, shard_count = shard
-            self.index = np.array_split(self.index, shard_count)[shard_idx]
+            start, end = _shard_bounds(len(self.index), shard_idx, shard_count)
+            self.index = self.index[start:end]
 
         # Shuffle.
         if shuffle:
@@ -412,8 +455,7 @@ class IndexedTFRecordIterator:
         try:
             data = _read_data(
                 self.file,
-                self.length_bytes,
-                self.crc_bytes,
+                self.header_bytes,
                 self.datum_bytes
             )
         except Exception as e:
@@ -430,6 +472,30 @@ class IndexedTFRecordIterator:
         self.file.close()
 
 
+def _process_example(iterator: Any, record: memoryview) -> Dict[str, np.ndarray]:
+    """Parse an Example record for an (Indexed)ExampleIterator.
+
+    The feature description and the field type of each feature are resolved
+    and validated on the first record, and reused for the remaining records
+    in the TFRecord.
+    """
+    example = example_pb2.Example()
+    example.ParseFromString(record)
+    features = example.features.feature
+    if iterator._resolved_description is None:
+        description = resolve_feature_description(features, iterator.description)
+        iterator._resolved_description = {
+            key: feature_typename(
+                features[key], typename, iterator.typename_mapping, key
+            )
+            for key, typename in description.items()
+        }
+    return {
+        key: decode_feature_value(getattr(features[key], field).value, field)
+        for key, field in iterator._resolved_description.items()
+    }
+
+
 class ExampleIterator(TFRecordIterator):
     def __init__(
         self,
@@ -461,15 +527,10 @@ class ExampleIterator(TFRecordIterator):
             datum_bytes
         )
         self.description = description
+        self._resolved_description = None  # type: Optional[Dict]
 
     def process(self, record):
-        example = example_pb2.Example()
-        example.ParseFromString(record)
-        return extract_feature_dict(
-            example.features,
-            self.description,
-            self.typename_mapping
-        )
+        return _process_example(self, record)
 
 
 class IndexedExampleIterator(IndexedTFRecordIterator):
@@ -496,15 +557,10 @@ class IndexedExampleIterator(IndexedTFRecordIterator):
             seed=seed
         )
         self.description = description
+        self._resolved_description = None  # type: Optional[Dict]
 
     def process(self, record):
-        example = example_pb2.Example()
-        example.ParseFromString(record)
-        return extract_feature_dict(
-            example.features,
-            self.description,
-            self.typename_mapping
-        )
+        return _process_example(self, record)
 
 
 class SequenceIterator(TFRecordIterator):
@@ -637,6 +693,18 @@ def tfrecord_loader(
     )
 
 
+def _max_record_size(indices: Optional[List[np.ndarray]]) -> int:
+    """Return the largest record length (in bytes) across TFRecord indices."""
+    if indices is None:
+        return 0
+    sizes = [
+        int(np.reshape(idx, (-1, idx.shape[-1]))[:, 1].max())
+        for idx in indices
+        if idx is not None and idx.size and idx.shape[-1] > 1
+    ]
+    return max(sizes, default=0)
+
+
 def multi_tfrecord_loader(
     paths: List[bytes],
     indices: Optional[List[np.ndarray]],
@@ -647,6 +715,7 @@ def multi_tfrecord_loader(
     shard: Optional[Tuple[int, int]] = None,
     clip: List[int] = None,
     infinite: bool = True,
+    prefetch_depth: int = 0,
 ) -> Iterable[Union[Dict[str, np.ndarray],
                     Tuple[Dict[str, np.ndarray],
                     Dict[str, List[np.ndarray]]]]]:
@@ -686,6 +755,11 @@ def multi_tfrecord_loader(
     infinite: bool, optional, default=True
         Whether the returned iterator should be infinite or not
 
+    prefetch_depth: int, optional, default=0
+        If greater than zero, read and parse each tfrecord in a background
+        thread, buffering up to this many records per tfrecord. Memory use
+        grows with the number of tfrecords. Disabled by default.
+
     Returns:
     --------
     it: iterator
@@ -696,19 +770,36 @@ def multi_tfrecord_loader(
         log.debug("Index files not found for tfrecord; unable to perform "
                   " clipping or sharding (data will be duplicated).")
 
-    datum_bytes = bytearray(1024 * 1024)
-    loaders = [
-        tfrecord_loader(
-            data_path=tfr_path.decode('utf-8'),
+    # Size the shared read buffer to fit the largest record up front, so
+    # that it does not need to grow while iterating. Index entries are
+    # (start byte, record length), and record length includes framing.
+    # Loaders are read one record at a time by the sampler, so sharing
+    # a single buffer between them is safe. Prefetching loaders read
+    # concurrently, and so each use their own buffer.
+    buffer_size = max(1024 * 1024, _max_record_size(indices))
+    datum_bytes = bytearray(buffer_size) if not prefetch_depth else None
+
+    def _make_loader(i):
+        return tfrecord_loader(
+            data_path=paths[i].decode('utf-8'),
             index=indices[i] if indices is not None else None,
             description=description,
             shard=shard,
             clip=(None if not clip else clip[i]),
             sequence_description=sequence_description,
             compression_type=compression_type,
-            datum_bytes=datum_bytes)
-        for i, tfr_path in enumerate(paths)
+            datum_bytes=(datum_bytes or bytearray(buffer_size)))
+
+    # Loaders (and their open files) are created on first read.
+    loaders = [
+        iterator_utils.LazyLoader(partial(_make_loader, i))
+        for i in range(len(paths))
     ]
+    if prefetch_depth:
+        loaders = [
+            iterator_utils.PrefetchIterator(loader, prefetch_depth)
+            for loader in loaders
+        ]
     if weights is not None:
         weights_list = weights
     else:
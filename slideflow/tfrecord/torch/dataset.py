@@ -303,6 +303,11 @@ class MultiTFRecordDataset(torch.utils.data.IterableDataset):
 
     infinite: bool, optional, default=True
         Whether the Dataset should be infinite or not
+
+    prefetch_depth: int, optional, default=0
+        If greater than zero, read and parse each tfrecord in a background
+        thread, buffering up to this many records per tfrecord. Memory use
+        grows with the number of tfrecords. Disabled by default.
     """
 
     def __init__(
@@ -317,7 +322,8 @@ class MultiTFRecordDataset(torch.utils.data.IterableDataset):
         clip: Optional[List[int]] = None,
         sequence_description: Union[List[str], Dict[str, str], None] = None,
         compression_type: Optional[str] = None,
-        infinite: bool = True
+        infinite: bool = True,
+        prefetch_depth: int = 0
     ) -> None:
         super(MultiTFRecordDataset, self).__init__()
         self.paths = paths
@@ -331,6 +337,7 @@ class MultiTFRecordDataset(torch.utils.data.IterableDataset):
         self.infinite = infinite
         self.shard = shard
         self.clip = clip
+        self.prefetch_depth = prefetch_depth
         self.loader = None
 
     def __iter__(self):
@@ -343,7 +350,8 @@ class MultiTFRecordDataset(torch.utils.data.IterableDataset):
             compression_type=self.compression_type,
             shard=self.shard,
             clip=self.clip,
-            infinite=self.infinite
+            infinite=self.infinite,
+            prefetch_depth=self.prefetch_depth
         )
         it = iter(self.loader)
         if self.shuffle_queue_size:
@@ -595,16 +595,28 @@ def multi_warn(arr: List, compare: Callable, msg: Union[Callable, str]) -> int:
     return num_warned
 
 
-def to_onehot(val: int, max: int) -> np.ndarray:
+def to_onehot(
+    val: Union[int, np.ndarray],
+    max: int,
+    dtype: type = np.int64
+) -> np.ndarray:
     """Converts value to one-hot encoding
 
     Args:
-        val (int): Value to encode
+        val (int or array-like): Value to encode. If an array of values is
+            provided, returns one one-hot encoding per value, with shape
+            (len(val), max).
         max (int): Maximum value (length of onehot encoding)
+        dtype (np.dtype, optional): Data type of the returned encoding.
+            Defaults to np.int64.
     """
-
-    onehot = np.zeros(max, dtype=np.int64)
-    onehot[val] = 1
+    val = np.asarray(val)
+    if val.ndim == 0:
+        onehot = np.zeros(max, dtype=dtype)
+        onehot[val] = 1
+        return onehot
+    onehot = np.zeros((val.size, max), dtype=dtype)
+    onehot[np.arange(val.size), val.ravel()] = 1
     return onehot
 
 
@@ -1015,11 +1027,7 @@ def contains_nested_subdirs(directory: str) -> bool:
 def path_to_name(path: str) -> str:
     '''Returns name of a file, without extension,
     from a given full path string.'''
-    _file = path.split('/')[-1]
-    if len(_file.split('.')) == 1:
-        return _file
-    else:
-        return '.'.join(_file.split('.')[:-1])
+    return path.rsplit('/', 1)[-1].rsplit('.', 1)[0]
 
 
 def path_to_ext(path: str) -> str:
@@ -1455,32 +1463,72 @@ def split_list(a: List, n: int) -> List[List]:
 
 # --- TFRecord utility functions ----------------------------------------------
 
+# Whether protobuf repeated scalar fields expose the buffer protocol.
+# Determined on first use; None if not yet known.
+_repeated_supports_buffer = None  # type: Optional[bool]
+
+
+def _repeated_to_array(value: Any, dtype: type) -> np.ndarray:
+    """Convert a protobuf repeated scalar field to a numpy array.
+
+    Copies the underlying buffer directly if the protobuf implementation
+    supports it, rather than converting element-by-element.
+    """
+    global _repeated_supports_buffer
+    if _repeated_supports_buffer is not False:
+        try:
+            arr = np.array(memoryview(value), dtype=dtype)
+            _repeated_supports_buffer = True
+            return arr
+        except TypeError:
+            _repeated_supports_buffer = False
+    return np.fromiter(value, dtype=dtype, count=len(value))
+
+
 def process_feature(
     feature: example_pb2.Feature,  # type: ignore
     typename: str,
     typename_mapping: Dict,
     key: str
 ) -> np.ndarray:
-    # NOTE: We assume that each key in the example has only one field
-    # (either "bytes_list", "float_list", or "int64_list")!
-    field = feature.ListFields()[0]  # type: ignore
-    inferred_typename, value = field[0].name, field[1].value
+    # NOTE: Each feature has exactly one field set
+    # (either "bytes_list", "float_list", or "int64_list").
+    inferred_typename = feature_typename(feature, typename, typename_mapping, key)
+    value = getattr(feature, inferred_typename).value
+    return decode_feature_value(value, inferred_typename)
+
 
+def feature_typename(
+    feature: example_pb2.Feature,  # type: ignore
+    typename: Optional[str],
+    typename_mapping: Dict,
+    key: str
+) -> str:
+    """Return the name of the set field of a feature (e.g. "float_list"),
+    verifying it against the expected typename if provided."""
+    inferred_typename = feature.WhichOneof('kind')
     if typename is not None:
         tf_typename = typename_mapping[typename]
         if tf_typename != inferred_typename:
-            reversed_mapping = {v: k for k, v in typename_mapping.items()}
+            expected = next(
+                (k for k, v in typename_mapping.items() if v == inferred_typename),
+                inferred_typename
+            )
             raise TypeError(
                 f"Incompatible type '{typename}' for `{key}` "
-                f"(should be '{reversed_mapping[inferred_typename]}')."
+                f"(should be '{expected}')."
             )
+    return inferred_typename
+
 
+def decode_feature_value(value: Any, inferred_typename: str) -> np.ndarray:
+    """Convert the value of a feature field to a numpy array."""
     if inferred_typename == "bytes_list":
-        value = np.frombuffer(value[0], dtype=np.uint8)
+        return np.frombuffer(value[0], dtype=np.uint8)
     elif inferred_typename == "float_list":
-        value = np.array(value, dtype=np.float32)
+        return _repeated_to_array(value, np.float32)
     elif inferred_typename == "int64_list":
-        value = np.array(value, dtype=np.int64)
+        return _repeated_to_array(value, np.int64)
     return value
 
 
@@ -1513,21 +1561,34 @@ def extract_feature_dict(
                         f"example_pb2.Features or example_pb2.FeatureLists and "
                         f"not {type(features)}")
 
+    description = resolve_feature_description(features, description)
+    return {
+        key: get_value(typename, typename_mapping, key)
+        for key, typename in description.items()
+    }
+
+
+def resolve_feature_description(
+    features: Any,
+    description: Optional[Union[List, Dict]]
+) -> Dict[str, Optional[str]]:
+    """Resolve a feature description into a dict mapping keys to typenames.
+
+    Verifies that all requested keys exist in the given feature map. As the
+    schema is fixed within a TFRecord, the result can be reused for all
+    records in a file.
+    """
     all_keys = list(features.keys())  # type: ignore
 
     if description is None or len(description) == 0:
-        description = dict.fromkeys(all_keys, None)
+        return dict.fromkeys(all_keys, None)
     elif isinstance(description, list):
         description = dict.fromkeys(description, None)
 
-    processed_features = {}
-    for key, typename in description.items():
+    for key in description:
         if key not in all_keys:
             raise KeyError(f"Key {key} doesn't exist (select from {all_keys})!")
-
-        processed_features[key] = get_value(typename, typename_mapping, key)
-
-    return processed_features
+    return description
 
 
 def load_predictions(path: str, **kwargs) -> pd.DataFrame:
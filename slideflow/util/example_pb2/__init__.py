@@ -1,8 +1,19 @@
+import logging
 from packaging import version
 from google.protobuf import __version__ as protobuf_version
+from google.protobuf.internal import api_implementation
 
 if version.parse(protobuf_version) < version.parse("3.21"):
     from ._proto3_pb2 import *
 else:
     from ._proto4_pb2 import *
 
+# TFRecord parsing is dominated by protobuf decoding, which is 10-100x
+# slower with the pure-Python implementation than with upb/C++.
+if api_implementation.Type() == 'python':
+    logging.getLogger('slideflow').warning(
+        "Using the pure-Python protobuf implementation, which will slow "
+        "TFRecord reading. Upgrade protobuf (>=4.21) or unset "
+        "PROTOCOL_BUFFERS_PYTHON_IMPLEMENTATION=python to use the faster "
+        "upb/C++ implementation."
+    )
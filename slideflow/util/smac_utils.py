@@ -183,6 +183,29 @@ def shallow_search_space(
         **kwargs
     )
 
+# (name, kind, extra hyperparameter kwargs) for the search space parameters
+# built generically by create_search_space(), in the order they are added.
+_HP_SPEC = (
+    ("augment", "categorical", {}),
+    ("normalizer", "categorical", {}),
+    ("normalizer_source", "categorical", {}),
+    ("model", "categorical", {}),
+    ("batch_size", "ordinal", {}),
+    ("dropout", "float", {}),
+    ("l1", "float", {}),
+    ("l2", "float", {}),
+    ("l1_dense", "float", {}),
+    ("l2_dense", "float", {}),
+    ("learning_rate", "float", {"log": True}),
+    ("learning_rate_decay", "float", {}),
+    ("learning_rate_decay_steps", "int", {"log": True}),
+    ("hidden_layers", "ordinal", {}),
+    ("hidden_layer_width", "ordinal", {}),
+    ("pooling", "categorical", {}),
+    ("trainable_layers", "int", {}),
+)
+
+
 def create_search_space(
     *,
     # Preprocessing hyperparameters
@@ -260,6 +283,8 @@ def create_search_space(
         ConfigSpace.ConfigurationSpace
 
     """
+    params = dict(locals())
+
     # Delayed imports due to long import time
     import ConfigSpace.hyperparameters as cs_hp
     from ConfigSpace import (
@@ -283,88 +308,42 @@ def create_search_space(
             cs.add_hyperparameter(cs_hp.OrdinalHyperparameter("tile_um", tile_um, default_value=tile_um[0]))
         else:
             cs.add_hyperparameter(cs_hp.CategoricalHyperparameter("tile_um", tile_um, default_value=tile_um[0]))
-    if augment is not None:
-        assert isinstance(augment, list)
-        cs.add_hyperparameter(cs_hp.CategoricalHyperparameter("augment", augment, default_value=augment[0]))
-    if normalizer is not None:
-        assert isinstance(normalizer, list)
-        cs.add_hyperparameter(cs_hp.CategoricalHyperparameter("normalizer", normalizer, default_value=normalizer[0]))
-    if normalizer_source is not None:
-        assert isinstance(normalizer_source, list)
-        cs.add_hyperparameter(cs_hp.CategoricalHyperparameter("normalizer_source", normalizer_source, default_value=normalizer_source[0]))
 
-    # --- Model/architecture hyperparameters ----------------------------------
-    if model is not None:
-        assert isinstance(model, list)
-        cs.add_hyperparameter(cs_hp.CategoricalHyperparameter("model", model, default_value=model[0]))
-
-    # --- Training hyperparameters --------------------------------------------
-    if batch_size is not None:
-        assert isinstance(batch_size, list)
-        assert all([isinstance(b, int) for b in batch_size])
-        batch_size = sorted(batch_size)
-        cs.add_hyperparameter(cs_hp.OrdinalHyperparameter("batch_size", batch_size, default_value=batch_size[0]))
-    if dropout is not None:
-        assert isinstance(dropout, (list, tuple)) and len(dropout) == 2
-        cs.add_hyperparameter(cs_hp.UniformFloatHyperparameter("dropout", dropout[0], dropout[1]))
-    if l1 is not None:
-        assert isinstance(l1, (list, tuple)) and len(l1) == 2
-        cs.add_hyperparameter(cs_hp.UniformFloatHyperparameter("l1", l1[0], l1[1]))
-    if l2 is not None:
-        assert isinstance(l2, (list, tuple)) and len(l2) == 2
-        cs.add_hyperparameter(cs_hp.UniformFloatHyperparameter("l2", l2[0], l2[1]))
-    if l1_dense is not None:
-        assert isinstance(l1_dense, (list, tuple)) and len(l1_dense) == 2
-        cs.add_hyperparameter(cs_hp.UniformFloatHyperparameter("l1_dense", l1_dense[0], l1_dense[1]))
-    if l2_dense is not None:
-        assert isinstance(l2_dense, (list, tuple)) and len(l2_dense) == 2
-        cs.add_hyperparameter(cs_hp.UniformFloatHyperparameter("l2_dense", l2_dense[0], l2_dense[1]))
-    if learning_rate is not None:
-        assert isinstance(learning_rate, (list, tuple)) and len(learning_rate) == 2
-        cs.add_hyperparameter(cs_hp.UniformFloatHyperparameter("learning_rate", learning_rate[0], learning_rate[1], log=True))
-    if learning_rate_decay is not None:
-        assert isinstance(learning_rate_decay, (list, tuple)) and len(learning_rate_decay) == 2
-        decay = cs_hp.UniformFloatHyperparameter("learning_rate_decay", learning_rate_decay[0], learning_rate_decay[1])
-        cs.add_hyperparameter(decay)
-    if learning_rate_decay_steps is not None:
-        assert isinstance(learning_rate_decay_steps, (list, tuple)) and len(learning_rate_decay_steps) == 2
-        lr_start, lr_end = learning_rate_decay_steps
-        decay_steps = cs_hp.UniformIntegerHyperparameter("learning_rate_decay_steps", lr_start, lr_end, log=True)
-        cs.add_hyperparameter(decay_steps)
-    if hidden_layers is not None:
-        assert isinstance(hidden_layers, (list, tuple))
-        assert all([isinstance(b, int) for b in hidden_layers])
-        hidden_layers = sorted(hidden_layers)
-        hl = cs_hp.OrdinalHyperparameter("hidden_layers", hidden_layers, default_value=hidden_layers[0])
-        cs.add_hyperparameter(hl)
-    if hidden_layer_width is not None:
-        assert isinstance(hidden_layer_width, (list, tuple))
-        assert all([isinstance(b, int) for b in hidden_layer_width])
-        hidden_layer_width = sorted(hidden_layer_width)
-        hl_width = cs_hp.OrdinalHyperparameter("hidden_layer_width", hidden_layer_width, default_value=hidden_layer_width[0])
-        cs.add_hyperparameter(hl_width)
-    if pooling is not None:
-        assert isinstance(pooling, list)
-        cs.add_hyperparameter(cs_hp.CategoricalHyperparameter("pooling", pooling, default_value=pooling[0]))
-    if trainable_layers is not None:
-        assert isinstance(trainable_layers, (list, tuple)) and len(trainable_layers) == 2
-        tl_start, tl_end = trainable_layers
-        cs.add_hyperparameter(cs_hp.UniformIntegerHyperparameter("trainable_layers", tl_start, tl_end))
+    # --- Remaining preprocessing, model, and training hyperparameters --------
+    for name, kind, hp_kwargs in _HP_SPEC:
+        value = params[name]
+        if value is None:
+            continue
+        if kind == 'categorical':
+            assert isinstance(value, list)
+            hp = cs_hp.CategoricalHyperparameter(name, value, default_value=value[0])
+        elif kind == 'ordinal':
+            assert isinstance(value, (list, tuple))
+            assert all([isinstance(b, int) for b in value])
+            value = sorted(value)
+            hp = cs_hp.OrdinalHyperparameter(name, value, default_value=value[0])
+        elif kind == 'float':
+            assert isinstance(value, (list, tuple)) and len(value) == 2
+            hp = cs_hp.UniformFloatHyperparameter(name, value[0], value[1], **hp_kwargs)
+        else:
+            assert isinstance(value, (list, tuple)) and len(value) == 2
+            hp = cs_hp.UniformIntegerHyperparameter(name, value[0], value[1], **hp_kwargs)
+        cs.add_hyperparameter(hp)
     if early_stop:
         cs_hp.CategoricalHyperparameter("early_stop", [True, False], default_value=False)
 
     # --- Conditions ----------------------------------------------------------
     # Only sample hyperparameter hidden_layer_width if hidden_layers > 0
     if hidden_layers is not None and hidden_layer_width is not None:
-        cs.add_condition(NotEqualsCondition(hl_width, hl, 0))
+        cs.add_condition(NotEqualsCondition(cs['hidden_layer_width'], cs['hidden_layers'], 0))
     # Only sample learning_rate_decay_steps if learning_rate_decay < 1 (decay of 1 is no decay)
     if learning_rate_decay is not None and learning_rate_decay_steps is not None:
-        cs.add_condition(LessThanCondition(decay_steps, decay, 1))
+        cs.add_condition(LessThanCondition(cs['learning_rate_decay_steps'], cs['learning_rate_decay'], 1))
     # Do not sample l1_dense if hidden_layers = 0
     if hidden_layers is not None and l1_dense is not None:
-        cs.add_condition(NotEqualsCondition(cs['l1_dense'], hl, 0))
+        cs.add_condition(NotEqualsCondition(cs['l1_dense'], cs['hidden_layers'], 0))
     # Do not sample l2_dense if hidden_layers = 0
     if hidden_layers is not None and l2_dense is not None:
-        cs.add_condition(NotEqualsCondition(cs['l2_dense'], hl, 0))
+        cs.add_condition(NotEqualsCondition(cs['l2_dense'], cs['hidden_layers'], 0))
 
     return cs